@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for monitor-expiry.py.
+
+Runs against local stand-in servers, never a real Keyfactor or webhook.
+
+Usage: python bench_monitor.py --bench-classify | --bench-alerts | --bench-engines
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+_spec = importlib.util.spec_from_file_location(
+    'monitor_expiry', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitor-expiry.py')
+)
+monitor_expiry = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(monitor_expiry)
+
+
+def benchmark_classification(sizes=(10_000, 100_000, 1_000_000)):
+    """
+    Time the per-certificate thread pool dispatch the monitor used to do
+    against batch classification as a plain loop and with NumPy.
+    """
+    monitor = monitor_expiry.CertificateMonitor('http://localhost', '', '', '')
+    monitor_expiry.logger.disabled = True
+    now = time.time()
+    
+    def thread_pool(certificates):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [executor.submit(monitor.check_expiry, cert) for cert in certificates]
+            return [future.result() for future in as_completed(futures)]
+    
+    methods = [
+        ('thread pool', thread_pool),
+        ('plain loop', lambda certificates: monitor_expiry.classify_batch(certificates, now, use_numpy=False)),
+    ]
+    if monitor_expiry.np is not None:
+        methods.append(('numpy', lambda certificates: monitor_expiry.classify_batch(certificates, now)))
+    else:
+        print("numpy not installed, skipping vectorized classification")
+    
+    for size in sizes:
+        certificates = [
+            {'Id': i, 'NotAfter': datetime.fromtimestamp(now + (i % 400 - 20) * 86400 + 3600,
+                                                         timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')}
+            for i in range(size)
+        ]
+        baseline = None
+        for name, method in methods:
+            start = time.perf_counter()
+            method(certificates)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{size:>9,} certificates  {name:<12} {elapsed:8.3f}s  "
+                  f"{size / elapsed:>12,.0f}/s  x{baseline / elapsed:.1f}")
+    
+    monitor_expiry.logger.disabled = False
+    return 0
+
+
+def _serve_locally(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def mock_webhook(received, latency):
+    """Local stand-in webhook that records batch sizes into `received`."""
+    class WebhookHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            received.append(len(body) if isinstance(body, list) else 1)
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        
+        def log_message(self, *args):
+            pass
+    
+    server, url = _serve_locally(WebhookHandler)
+    return server, f"{url}/alerts"
+
+
+def mock_keyfactor(count, latency):
+    """Local stand-in for the Keyfactor certificate listing with `count` certificates."""
+    now = time.time()
+    
+    class KeyfactorHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            page = int(query['pq.pageReturned'][0])
+            limit = int(query['pq.returnLimit'][0])
+            body = json.dumps([
+                {'Id': i, 'Thumbprint': f"{i:040X}", 'IssuedDN': f"CN=host{i}.contoso.com",
+                 'NotAfter': datetime.fromtimestamp(now + (i % 400 - 20) * 86400 + 3600,
+                                                    timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')}
+                for i in range((page - 1) * limit, min(page * limit, count))
+            ]).encode('utf-8')
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server, url = _serve_locally(KeyfactorHandler)
+    return server, url
+
+
+def benchmark_alerts(count=5000, latency=0.002):
+    """
+    Deliver `count` alerts to a local stand-in webhook that takes
+    `latency` seconds per request: one requests.post per alert as the
+    monitor used to, then through AlertDispatcher unbatched and batched.
+    """
+    received = []
+    server, url = mock_webhook(received, latency)
+    payload = {'severity': 'WARNING', 'subject': 'CN=bench', 'thumbprint': '00' * 20,
+               'daysUntilExpiry': 10, 'expiryDate': datetime.now().isoformat(),
+               'timestamp': datetime.now().isoformat()}
+    
+    def unpooled():
+        for _ in range(count):
+            requests.post(url, json=payload, timeout=10).raise_for_status()
+    
+    def dispatched(batch_size):
+        def run():
+            dispatcher = monitor_expiry.AlertDispatcher(url, batch_size=batch_size)
+            for _ in range(count):
+                dispatcher.submit(payload)
+            dispatcher.close()
+        return run
+    
+    methods = [
+        ('requests.post per alert', unpooled),
+        (f'dispatcher x{monitor_expiry.ALERT_CONCURRENCY}', dispatched(1)),
+        (f'dispatcher x{monitor_expiry.ALERT_CONCURRENCY}, batch 50', dispatched(50)),
+    ]
+    print(f"{count:,} alerts, {latency * 1000:.0f} ms webhook latency")
+    for name, method in methods:
+        received.clear()
+        start = time.perf_counter()
+        method()
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<32} {elapsed:7.2f}s  {count / elapsed:>9,.0f} alerts/s  "
+              f"{len(received):>6,} requests  {sum(received):>6,} delivered")
+    
+    server.shutdown()
+    return 0
+
+
+def benchmark_engines(count=100_000, page_latency=0.05, alert_latency=0.002):
+    """
+    Run one full cycle with each engine against local mock Keyfactor and
+    webhook servers, each starting from an empty snapshot and alert state.
+    """
+    received = []
+    keyfactor, keyfactor_url = mock_keyfactor(count, page_latency)
+    webhook, monitor_expiry.ALERT_WEBHOOK_URL = mock_webhook(received, alert_latency)
+    monitor_expiry.logger.setLevel(logging.CRITICAL)  # per-certificate status lines would dominate
+    
+    engines = [('threads', monitor_expiry.CertificateMonitor)]
+    if monitor_expiry.aiohttp is not None:
+        engines.append(('asyncio', monitor_expiry.AsyncCertificateMonitor))
+    else:
+        print("aiohttp not installed, skipping the asyncio engine")
+    
+    print(f"{count:,} certificates, {page_latency * 1000:.0f} ms per page, "
+          f"{alert_latency * 1000:.0f} ms per alert request")
+    for name, engine in engines:
+        received.clear()
+        with tempfile.TemporaryDirectory() as directory:
+            monitor = engine(keyfactor_url, 'bench', 'bench', 'BENCH')
+            snapshot = monitor_expiry.CertificateSnapshot(os.path.join(directory, 'snapshot.db'))
+            alert_state = monitor_expiry.AlertStateStore(os.path.join(directory, 'alerts.db'))
+            start = time.perf_counter()
+            checked = monitor.run_cycle(snapshot, alert_state, monitor_expiry.CrossingSchedule())
+            elapsed = time.perf_counter() - start
+            if isinstance(monitor, monitor_expiry.AsyncCertificateMonitor):
+                monitor.close()
+        print(f"  {name:<8} {elapsed:7.2f}s  {checked / elapsed:>9,.0f} certificates/s  "
+              f"{sum(received):>6,} alerts in {len(received):,} requests")
+    
+    keyfactor.shutdown()
+    webhook.shutdown()
+    return 0
+
+
+BENCHMARKS = {
+    '--bench-classify': benchmark_classification,
+    '--bench-alerts': benchmark_alerts,
+    '--bench-engines': benchmark_engines,
+}
+
+
+def main():
+    selected = [flag for flag in sys.argv[1:] if flag in BENCHMARKS]
+    if not selected:
+        print(f"Usage: {sys.argv[0]} {' | '.join(BENCHMARKS)}", file=sys.stderr)
+        return 2
+    for flag in selected:
+        BENCHMARKS[flag]()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,12 +5,35 @@ High-performance monitoring for certificate expiry across all stores.
 """
 
 import requests
+import asyncio
+import base64
+import bisect
+import functools
+import hashlib
+import heapq
 import logging
 import os
+import queue
+import re
+import socket
+import sqlite3
 import sys
+import threading
 import time
-from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import numpy as np
+except ImportError:  # classification falls back to a plain loop
+    np = None
+
+try:
+    import aiohttp
+except ImportError:  # only needed for MONITOR_ENGINE=asyncio
+    aiohttp = None
 
 # Configuration
 KEYFACTOR_HOST = os.environ.get('KEYFACTOR_HOST')
@@ -20,9 +43,35 @@ KEYFACTOR_DOMAIN = os.environ.get('KEYFACTOR_DOMAIN', 'CONTOSO')
 
 WARNING_DAYS = int(os.environ.get('WARNING_DAYS', 30))
 CRITICAL_DAYS = int(os.environ.get('CRITICAL_DAYS', 7))
-CHECK_INTERVAL = int(os.environ.get('CHECK_INTERVAL', 60))  # minutes
+CHECK_INTERVAL = int(os.environ.get('CHECK_INTERVAL', 60))  # minutes between polls for changes
+
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 1000))
+PREFETCH_PAGES = int(os.environ.get('PREFETCH_PAGES', 4))  # page requests in flight
+
+SNAPSHOT_PATH = os.environ.get('SNAPSHOT_PATH', '/var/lib/keyfactor/monitor-snapshot.db')
+FULL_RECONCILE_HOURS = int(os.environ.get('FULL_RECONCILE_HOURS', 24))  # 0 = full fetch every cycle
+DELTA_OVERLAP_MINUTES = int(os.environ.get('DELTA_OVERLAP_MINUTES', 10))  # clock skew allowance
 
 ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL')
+ALERT_STATE_PATH = os.environ.get('ALERT_STATE_PATH', '/var/lib/keyfactor/monitor-alerts.db')
+RENOTIFY_HOURS = int(os.environ.get('RENOTIFY_HOURS', 24))  # 0 = only notify on severity changes
+ALERT_CONCURRENCY = int(os.environ.get('ALERT_CONCURRENCY', 8))  # webhook requests in flight
+ALERT_BATCH_SIZE = int(os.environ.get('ALERT_BATCH_SIZE', 1))  # >1 posts a JSON array of alerts
+ALERT_QUEUE_SIZE = int(os.environ.get('ALERT_QUEUE_SIZE', 1000))  # senders block when full
+ALERT_MAX_RETRIES = int(os.environ.get('ALERT_MAX_RETRIES', 3))
+ALERT_RETRY_BACKOFF = float(os.environ.get('ALERT_RETRY_BACKOFF', 1.0))  # seconds, doubled per retry
+
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))  # serve /metrics on this port; 0 = disabled
+
+MONITOR_ENGINE = os.environ.get('MONITOR_ENGINE', 'threads')  # threads or asyncio
+ASYNC_FETCH_CONCURRENCY = int(os.environ.get('ASYNC_FETCH_CONCURRENCY', PREFETCH_PAGES))
+ASYNC_CLASSIFY_CONCURRENCY = int(os.environ.get('ASYNC_CLASSIFY_CONCURRENCY', 2))
+ASYNC_PAGE_QUEUE_SIZE = int(os.environ.get('ASYNC_PAGE_QUEUE_SIZE', 8))  # fetched pages awaiting classification
+
+SHARD_DIR = os.environ.get('SHARD_DIR')  # shared lease directory; unset = single worker
+WORKER_ID = os.environ.get('WORKER_ID', f"{socket.gethostname()}-{os.getpid()}")
+SHARD_LEASE_SECS = int(os.environ.get('SHARD_LEASE_SECS', 90))
+SHARD_ID_BLOCK = int(os.environ.get('SHARD_ID_BLOCK', 1000))  # consecutive Ids placed on the ring together
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,127 +80,1302 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def alert_payload(cert, severity, days_until_expiry):
+    return {
+        'severity': severity,
+        'subject': cert.get('IssuedDN'),
+        'thumbprint': cert.get('Thumbprint'),
+        'daysUntilExpiry': days_until_expiry,
+        'expiryDate': cert.get('NotAfter'),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+class Metric:
+    """
+    Minimal Prometheus metric with optional labels. Updates take one
+    uncontended lock and a dict lookup, so they are cheap enough for the
+    per-certificate path; formatting only happens when /metrics is scraped.
+    """
+    kind = 'untyped'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {} if labelnames else {(): 0}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def _labels(self, key, extra=''):
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+    
+    def samples(self):
+        with self.lock:
+            return [(f"{self.name}{self._labels(key)}", value) for key, value in self.values.items()]
+    
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name} {value}" for name, value in self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+    
+    def inc(self, amount=1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+    
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+    
+    def set_function(self, function):
+        """Read the value from `function` at scrape time instead."""
+        self.samples = lambda: [(self.name, function())]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, buckets):
+        super().__init__(name, documentation)
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+    
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+    
+    def samples(self):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        samples, cumulative = [], 0
+        for bound, count in zip(self.buckets + [float('inf')], counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            samples.append((f'{self.name}_bucket{{le="{le}"}}', cumulative))
+        samples.append((f"{self.name}_sum", total))
+        samples.append((f"{self.name}_count", cumulative))
+        return samples
+
+
+REGISTRY = []
+
+CERTIFICATES = Gauge('keyfactor_monitor_certificates', 'Certificates in the snapshot by severity', ('severity',))
+SCHEDULED_CROSSINGS = Gauge('keyfactor_monitor_scheduled_crossings', 'Threshold crossings waiting in the schedule')
+ALERT_QUEUE_DEPTH = Gauge('keyfactor_monitor_alert_queue_depth', 'Alerts waiting for a sender thread')
+LAST_SUCCESS = Gauge('keyfactor_monitor_last_success_timestamp_seconds', 'End of the last successful cycle')
+PAGE_FETCH_SECONDS = Histogram('keyfactor_monitor_page_fetch_seconds', 'Keyfactor certificate page fetch latency',
+                               (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+CYCLE_SECONDS = Histogram('keyfactor_monitor_cycle_duration_seconds', 'Duration of full and delta cycles',
+                          (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600))
+ALERT_SEND_SECONDS = Histogram('keyfactor_monitor_alert_send_seconds', 'Webhook request latency per alert request',
+                               (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10))
+API_ERRORS = Counter('keyfactor_monitor_api_errors_total', 'Failed Keyfactor API requests')
+CERTIFICATES_CHECKED = Counter('keyfactor_monitor_certificates_checked_total', 'Certificates classified')
+ALERTS_SENT = Counter('keyfactor_monitor_alerts_sent_total', 'Alerts accepted by the webhook', ('severity',))
+ALERTS_FAILED = Counter('keyfactor_monitor_alerts_failed_total', 'Alerts that failed after retries')
+ALERTS_DEDUPLICATED = Counter('keyfactor_monitor_alerts_deduplicated_total', 'Alerts suppressed by the alert state')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = ('\n'.join(metric.render() for metric in REGISTRY) + '\n').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics from a daemon thread."""
+    server = ThreadingHTTPServer(('', port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Serving metrics on :{port}/metrics")
+    return server
+
+
+def parse_not_after(value):
+    """Convert a Keyfactor timestamp to epoch seconds (naive values are UTC)."""
+    try:
+        expiry = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return expiry.timestamp()
+
+
+def threshold_offsets():
+    """
+    Seconds before NotAfter at which check_expiry changes status: it uses
+    whole days, so a certificate becomes CRITICAL once fewer than
+    CRITICAL_DAYS + 1 days remain, and EXPIRED at NotAfter itself.
+    """
+    return [0, (CRITICAL_DAYS + 1) * 86400, (WARNING_DAYS + 1) * 86400]
+
+
+STATUSES = ('EXPIRED', 'CRITICAL', 'WARNING', 'OK', 'ERROR')
+
+
+def classify_days(days_until_expiry):
+    """Map whole days until expiry (None if unparseable) to a status."""
+    if days_until_expiry is None:
+        return 'ERROR'
+    if days_until_expiry < 0:
+        return 'EXPIRED'
+    if days_until_expiry <= CRITICAL_DAYS:
+        return 'CRITICAL'
+    if days_until_expiry <= WARNING_DAYS:
+        return 'WARNING'
+    return 'OK'
+
+
+_UTC_OFFSET = re.compile(r'T.*[+-]\d{2}:?\d{2}$')
+
+
+def _not_after_array(values):
+    """Parse NotAfter strings in bulk into float epoch seconds (NaN if invalid)."""
+    seconds = np.full(len(values), np.nan)
+    bulk, positions = [], []
+    for i, value in enumerate(values):
+        if isinstance(value, str) and value.endswith('Z'):
+            bulk.append(value[:-1])
+            positions.append(i)
+        elif isinstance(value, str) and not _UTC_OFFSET.search(value):
+            bulk.append(value)
+            positions.append(i)
+        else:
+            # NumPy would convert an explicit offset but warns for every
+            # array; these (rare) values and non-strings go one by one
+            expiry = parse_not_after(value)
+            seconds[i] = np.nan if expiry is None else expiry
+    
+    try:
+        parsed = np.array(bulk, dtype='datetime64[ms]')
+        bulk_seconds = parsed.astype('int64') / 1000.0
+        bulk_seconds[np.isnat(parsed)] = np.nan
+    except ValueError:
+        # Sub-millisecond precision or malformed values
+        bulk_seconds = [parse_not_after(value) for value in bulk]
+        bulk_seconds = np.array([np.nan if v is None else v for v in bulk_seconds], dtype='float64')
+    seconds[positions] = bulk_seconds
+    return seconds
+
+
+def classify_batch(certificates, now=None, use_numpy=True):
+    """
+    Classify a batch of certificates in one pass, returning
+    (status, days_until_expiry) tuples in input order. With NumPy the
+    NotAfter column becomes a datetime64 array and the buckets come from
+    vectorized comparisons; without it the same rules run as a plain loop.
+    """
+    now = time.time() if now is None else now
+    values = [cert.get('NotAfter') for cert in certificates]
+    
+    if np is None or not use_numpy:
+        results = []
+        for value in values:
+            expiry = parse_not_after(value)
+            days = None if expiry is None else int((expiry - now) // 86400)
+            results.append((classify_days(days), days))
+        return results
+    
+    days = np.floor((_not_after_array(values) - now) / 86400)
+    codes = np.select(
+        [np.isnan(days), days < 0, days <= CRITICAL_DAYS, days <= WARNING_DAYS],
+        [4, 0, 1, 2],
+        default=3
+    )
+    return [
+        (STATUSES[code], None if code == 4 else int(day))
+        for code, day in zip(codes.tolist(), days.tolist())
+    ]
+
+
+def log_status(cert, status, days_until_expiry):
+    subject = cert.get('IssuedDN', 'Unknown')
+    if status == 'EXPIRED':
+        logger.error(f"🔴 EXPIRED: {subject} (Expired {-days_until_expiry} days ago)")
+    elif status == 'CRITICAL':
+        logger.error(f"🔴 CRITICAL: {subject} (Expires in {days_until_expiry} days)")
+    elif status == 'WARNING':
+        logger.warning(f"🟡 WARNING: {subject} (Expires in {days_until_expiry} days)")
+    elif status == 'ERROR':
+        logger.error(f"Error checking expiry for certificate {cert.get('Id')}: "
+                     f"invalid NotAfter {cert.get('NotAfter')!r}")
+
+
+class CertificateSnapshot:
+    """
+    Local copy of the inventory keyed by certificate Id, holding just the
+    fields needed to classify and alert, plus the delta watermark and the
+    time of the last full reconciliation.
+    """
+    
+    def __init__(self, path=SNAPSHOT_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS certificates (
+                id INTEGER PRIMARY KEY,
+                thumbprint TEXT,
+                subject TEXT,
+                not_after_raw TEXT,
+                not_after REAL,
+                generation INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS certificates_not_after ON certificates (not_after);
+            CREATE INDEX IF NOT EXISTS certificates_thumbprint ON certificates (thumbprint);
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT);
+        ''')
+        self.conn.commit()
+    
+    def get_state(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+    
+    def set_state(self, key, value):
+        self.conn.execute(
+            'INSERT INTO state (key, value) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+            (key, str(value))
+        )
+    
+    def request_full_reconcile(self):
+        self.conn.execute("DELETE FROM state WHERE key = 'last_full'")
+        self.conn.commit()
+    
+    def needs_full_reconcile(self, now):
+        last_full = self.get_state('last_full')
+        if last_full is None or FULL_RECONCILE_HOURS <= 0:
+            return True
+        return now - float(last_full) >= FULL_RECONCILE_HOURS * 3600
+    
+    def apply(self, certificates, generation):
+        """
+        Upsert a page of certificates and drop revoked ones. Returns the
+        certificates that are still live and should be classified.
+        """
+        live, rows, revoked = [], [], []
+        for cert in certificates:
+            if cert.get('RevocationEffDate'):
+                revoked.append((cert['Id'],))
+                continue
+            live.append(cert)
+            rows.append((
+                cert['Id'], cert.get('Thumbprint'), cert.get('IssuedDN'),
+                cert.get('NotAfter'), parse_not_after(cert.get('NotAfter')), generation
+            ))
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO certificates '
+            '(id, thumbprint, subject, not_after_raw, not_after, generation) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        self.conn.executemany('DELETE FROM certificates WHERE id = ?', revoked)
+        self.conn.commit()
+        return live
+    
+    def remove_unseen(self, generation):
+        """Drop certificates a completed full fetch did not return."""
+        cursor = self.conn.execute('DELETE FROM certificates WHERE generation < ?', (generation,))
+        self.conn.commit()
+        return cursor.rowcount
+    
+    def _select(self, column, values):
+        values = list(values)
+        for i in range(0, len(values), 500):
+            chunk = values[i:i + 500]
+            rows = self.conn.execute(
+                'SELECT id, thumbprint, subject, not_after_raw FROM certificates '
+                f"WHERE {column} IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            for cert_id, thumbprint, subject, not_after in rows:
+                yield {'Id': cert_id, 'Thumbprint': thumbprint,
+                       'IssuedDN': subject, 'NotAfter': not_after}
+    
+    def by_ids(self, ids):
+        """Yield snapshot certificates for the given Ids."""
+        return self._select('id', ids)
+    
+    def by_thumbprints(self, thumbprints):
+        """Yield snapshot certificates for the given thumbprints."""
+        return self._select('thumbprint', thumbprints)
+    
+    def expiries(self, after):
+        """Yield (Id, NotAfter epoch) for certificates expiring after `after`."""
+        return self.conn.execute(
+            'SELECT id, not_after FROM certificates WHERE not_after > ?', (after,)
+        )
+    
+    def summary(self, now):
+        """Count the whole snapshot per status without touching the API."""
+        _, critical, warning = (now + offset for offset in threshold_offsets())
+        row = self.conn.execute('''
+            SELECT COUNT(*),
+                   SUM(not_after IS NULL),
+                   SUM(not_after < ?),
+                   SUM(not_after >= ? AND not_after < ?),
+                   SUM(not_after >= ? AND not_after < ?),
+                   SUM(not_after >= ?)
+            FROM certificates
+        ''', (now, now, critical, critical, warning, warning)).fetchone()
+        total, error, expired, crit, warn, ok = (value or 0 for value in row)
+        return total, {'EXPIRED': expired, 'CRITICAL': crit, 'WARNING': warn,
+                       'OK': ok, 'ERROR': error}
+
+
+class CrossingSchedule:
+    """
+    Min-heap of (instant, Id) holding the next threshold crossing of every
+    snapshot certificate, so the monitor can sleep until exactly the next
+    one is due and then re-check only the certificates that crossed.
+    Entries are never removed in place: revoked or re-imported
+    certificates are filtered against the snapshot when they fire.
+    """
+    
+    def __init__(self):
+        self.heap = []
+    
+    def __len__(self):
+        return len(self.heap)
+    
+    @staticmethod
+    def next_crossing(not_after, after):
+        """
+        First crossing instant later than `after`, one second past the
+        boundary so check_expiry already reports the new status.
+        """
+        for offset in sorted(threshold_offsets(), reverse=True):
+            when = not_after - offset + 1
+            if when > after:
+                return when
+        return None
+    
+    @staticmethod
+    def is_crossing(not_after, when):
+        return any(when == not_after - offset + 1 for offset in threshold_offsets())
+    
+    def add(self, cert_id, not_after, after):
+        if not_after is None:
+            return
+        when = self.next_crossing(not_after, after)
+        if when is not None:
+            heapq.heappush(self.heap, (when, cert_id))
+    
+    def rebuild(self, snapshot, after):
+        """Schedule every certificate in the snapshot from `after` onwards."""
+        self.heap = []
+        for cert_id, not_after in snapshot.expiries(after - 1):
+            when = self.next_crossing(not_after, after)
+            if when is not None:
+                self.heap.append((when, cert_id))
+        heapq.heapify(self.heap)
+    
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+    
+    def pop_due(self, now):
+        """Pop every entry due by `now`, collapsing duplicates, as {Id: instant}."""
+        due = {}
+        while self.heap and self.heap[0][0] <= now:
+            when, cert_id = heapq.heappop(self.heap)
+            due[cert_id] = when
+        return due
+
+
+def _ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class ShardMembership:
+    """
+    Splits the inventory between monitor workers sharing SHARD_DIR. Every
+    worker keeps a lease file there fresh from a heartbeat thread; workers
+    whose lease is older than SHARD_LEASE_SECS are considered dead. Live
+    workers are placed on a consistent hash ring, and each block of
+    SHARD_ID_BLOCK consecutive certificate Ids belongs to exactly one of
+    them, so a worker joining or leaving only moves its neighbours' slices.
+    Hashing blocks rather than single Ids turns a slice into Id ranges
+    that Keyfactor can filter on.
+    """
+    
+    VNODES = 64
+    RANGES_PER_QUERY = 20  # keeps the query string short
+    
+    def __init__(self, directory=SHARD_DIR, worker_id=WORKER_ID, lease_secs=SHARD_LEASE_SECS,
+                 block=SHARD_ID_BLOCK):
+        self.directory = directory
+        self.worker_id = worker_id
+        self.lease_secs = lease_secs
+        self.block = block
+        self.lease_path = os.path.join(directory, f"{worker_id}.lease")
+        self.workers = []
+        self.points = []
+        self.owners = []
+        self.changed = threading.Event()
+        self.stopped = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+    
+    def heartbeat(self):
+        tmp_path = f"{self.lease_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(f"{self.worker_id} {time.time()}\n")
+        os.replace(tmp_path, self.lease_path)
+    
+    def live_workers(self):
+        cutoff = time.time() - self.lease_secs
+        workers = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.lease'):
+                continue
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    workers.append(entry.name[:-len('.lease')])
+            except FileNotFoundError:
+                continue
+        return sorted(workers)
+    
+    def refresh(self):
+        """Renew our lease and rebuild the ring if membership changed."""
+        self.heartbeat()
+        workers = self.live_workers()
+        if workers == self.workers:
+            return False
+        ring = sorted(
+            (_ring_hash(f"{worker}#{i}"), worker)
+            for worker in workers for i in range(self.VNODES)
+        )
+        # Swap both lists in one assignment so owns() never sees a mix
+        self.points, self.owners = [point for point, _ in ring], [worker for _, worker in ring]
+        self.workers = workers
+        logger.info(f"Shard membership: {len(workers)} workers ({', '.join(workers)})")
+        self.changed.set()
+        return True
+    
+    def owns(self, cert_id):
+        return self._owns_block(cert_id // self.block)
+    
+    def _owns_block(self, block):
+        points, owners = self.points, self.owners
+        if not points:
+            return True
+        index = bisect.bisect(points, _ring_hash(str(block))) % len(points)
+        return owners[index] == self.worker_id
+    
+    def queries(self, max_id):
+        """
+        Keyfactor queries that together cover this worker's Ids up to
+        max_id, as few merged Id ranges per query as RANGES_PER_QUERY allows.
+        """
+        ranges = []
+        for block in range(max_id // self.block + 1):
+            if not self._owns_block(block):
+                continue
+            start = block * self.block
+            if ranges and ranges[-1][1] == start:
+                ranges[-1][1] = start + self.block
+            else:
+                ranges.append([start, start + self.block])
+        return [
+            ' OR '.join(f"(Id>={start} AND Id<{end})" for start, end in ranges[i:i + self.RANGES_PER_QUERY])
+            for i in range(0, len(ranges), self.RANGES_PER_QUERY)
+        ]
+    
+    def start(self):
+        self.refresh()
+        threading.Thread(target=self._run, name='shard-heartbeat', daemon=True).start()
+    
+    def stop(self):
+        self.stopped.set()
+        try:
+            os.remove(self.lease_path)
+        except FileNotFoundError:
+            pass
+    
+    def _run(self):
+        while not self.stopped.wait(self.lease_secs / 3):
+            try:
+                self.refresh()
+            except OSError as e:
+                logger.error(f"Shard heartbeat failed: {e}")
+
+
+class AlertStateStore:
+    """
+    Last severity notified per thumbprint, so an alert is only sent on a
+    severity change or once RENOTIFY_HOURS have passed. The table is read
+    in bulk at start-up and served from memory; updates are buffered and
+    written in one transaction per flush. Alerts the webhook never
+    accepted are kept as UNDELIVERED until a later cycle delivers them.
+    """
+    
+    UNDELIVERED = 'UNDELIVERED'
+    
+    def __init__(self, path=ALERT_STATE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS alert_state (
+                thumbprint TEXT PRIMARY KEY,
+                severity TEXT NOT NULL,
+                sent_at REAL NOT NULL
+            )
+        ''')
+        self.conn.commit()
+        self.state = {
+            thumbprint: (severity, sent_at)
+            for thumbprint, severity, sent_at in self.conn.execute(
+                'SELECT thumbprint, severity, sent_at FROM alert_state')
+        }
+        self.pending = {}
+        self.lock = threading.Lock()
+        logger.info(f"Loaded alert state for {len(self.state)} certificates")
+    
+    def should_send(self, thumbprint, severity, now):
+        previous = self.state.get(thumbprint)
+        if previous is None or previous[0] != severity:
+            return True
+        return RENOTIFY_HOURS > 0 and now - previous[1] >= RENOTIFY_HOURS * 3600
+    
+    def record(self, thumbprint, severity, sent_at=None):
+        """Remember a delivered alert; safe to call from sender threads."""
+        sent_at = time.time() if sent_at is None else sent_at
+        with self.lock:
+            self.state[thumbprint] = (severity, sent_at)
+            self.pending[thumbprint] = (severity, sent_at)
+    
+    def record_failure(self, thumbprint):
+        """Remember an alert that failed after retries, so due() returns it."""
+        with self.lock:
+            self.state[thumbprint] = (self.UNDELIVERED, time.time())
+            self.pending[thumbprint] = (self.UNDELIVERED, time.time())
+    
+    def forget(self, thumbprint):
+        with self.lock:
+            if self.state.pop(thumbprint, None) is not None:
+                self.pending[thumbprint] = None
+    
+    def due(self, now):
+        """Thumbprints whose re-notify interval has elapsed or whose alert was undelivered."""
+        cutoff = now - RENOTIFY_HOURS * 3600 if RENOTIFY_HOURS > 0 else float('-inf')
+        with self.lock:
+            return [thumbprint for thumbprint, (severity, sent_at) in self.state.items()
+                    if severity == self.UNDELIVERED or sent_at <= cutoff]
+    
+    def flush(self, now, prune=True):
+        """
+        Write buffered updates in a single transaction. Entries past the
+        re-notify interval behave exactly like missing ones, so they are
+        pruned here; that also drops certificates that left the inventory.
+        Undelivered alerts are never pruned. Only prune once due() has been
+        read for the cycle, or the re-notifications it would have returned
+        are lost.
+        """
+        prune = prune and RENOTIFY_HOURS > 0
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            if prune:
+                cutoff = now - RENOTIFY_HOURS * 3600
+                for thumbprint in [t for t, (severity, sent_at) in self.state.items()
+                                   if sent_at <= cutoff and severity != self.UNDELIVERED]:
+                    del self.state[thumbprint]
+        
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO alert_state (thumbprint, severity, sent_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (thumbprint) DO UPDATE SET '
+                'severity = excluded.severity, sent_at = excluded.sent_at',
+                [(thumbprint, *value) for thumbprint, value in pending.items() if value]
+            )
+            self.conn.executemany(
+                'DELETE FROM alert_state WHERE thumbprint = ?',
+                [(thumbprint,) for thumbprint, value in pending.items() if value is None]
+            )
+            if prune:
+                self.conn.execute('DELETE FROM alert_state WHERE sent_at <= ? AND severity != ?',
+                                  (cutoff, self.UNDELIVERED))
+
+
+class AlertDispatcher:
+    """
+    Delivers webhook alerts from a pool of worker threads sharing one
+    keep-alive session. Alerts wait in a bounded queue, so a slow webhook
+    makes submit() block instead of buffering without limit. Each worker
+    coalesces up to batch_size queued alerts into a single JSON array
+    request and retries failures with exponential backoff.
+    """
+    
+    def __init__(self, url, concurrency=ALERT_CONCURRENCY, batch_size=ALERT_BATCH_SIZE,
+                 queue_size=ALERT_QUEUE_SIZE, max_retries=ALERT_MAX_RETRIES,
+                 backoff=ALERT_RETRY_BACKOFF):
+        self.url = url
+        self.batch_size = max(batch_size, 1)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.workers = [
+            threading.Thread(target=self._worker, name=f'alert-sender-{i}', daemon=True)
+            for i in range(concurrency)
+        ]
+        for worker in self.workers:
+            worker.start()
+    
+    def submit(self, payload, on_delivered=None, on_failed=None):
+        """Queue one alert payload, blocking while the queue is full."""
+        self.queue.put((payload, on_delivered, on_failed))
+    
+    def drain(self):
+        """Wait until every queued alert has been delivered or given up on."""
+        self.queue.join()
+    
+    def close(self):
+        self.drain()
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.session.close()
+    
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Hand the stop marker back for this worker's next loop
+                    self.queue.task_done()
+                    self.queue.put(None)
+                    break
+                batch.append(item)
+            
+            try:
+                if self._post([payload for payload, _, _ in batch]):
+                    for payload, on_delivered, _ in batch:
+                        ALERTS_SENT.inc(1, payload.get('severity'))
+                        if on_delivered:
+                            on_delivered()
+                else:
+                    ALERTS_FAILED.inc(len(batch))
+                    for _, _, on_failed in batch:
+                        if on_failed:
+                            on_failed()
+            except Exception as e:
+                logger.error(f"Alert sender failed: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    def _post(self, payloads):
+        body = payloads[0] if self.batch_size == 1 else payloads
+        for attempt in range(self.max_retries + 1):
+            try:
+                start = time.perf_counter()
+                response = self.session.post(self.url, json=body, timeout=10)
+                ALERT_SEND_SECONDS.observe(time.perf_counter() - start)
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    return True
+                error = f"HTTP {response.status_code}"
+            except requests.exceptions.HTTPError as e:
+                # Other 4xx responses will not succeed on retry
+                logger.error(f"Failed to send {len(payloads)} alert(s): {e}")
+                return False
+            except requests.exceptions.RequestException as e:
+                error = e
+            
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        
+        logger.error(f"Failed to send {len(payloads)} alert(s) after "
+                     f"{self.max_retries + 1} attempts: {error}")
+        return False
+
+
 class CertificateMonitor:
+    dispatcher_class = AlertDispatcher
+    
     def __init__(self, hostname, username, password, domain):
         self.base_url = f"{hostname}/KeyfactorAPI"
         self.session = requests.Session()
         self.session.auth = (f"{domain}\\{username}", password)
         self.session.headers.update({'Content-Type': 'application/json'})
-        self.session.timeout = 30
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(PREFETCH_PAGES, 10))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.dispatcher = None
+        self.membership = None
+        if ALERT_WEBHOOK_URL and self.dispatcher_class:
+            self.dispatcher = self.dispatcher_class(ALERT_WEBHOOK_URL)
+            ALERT_QUEUE_DEPTH.set_function(self.dispatcher.queue.qsize)
     
-    def get_certificates(self):
-        """Retrieve all certificates."""
+    def get_page(self, page, page_size=PAGE_SIZE, query=None):
+        """Retrieve one page of certificates."""
+        params = {'pq.pageReturned': page, 'pq.returnLimit': page_size}
+        if query:
+            params['pq.queryString'] = query
+        start = time.perf_counter()
         try:
-            response = self.session.get(f"{self.base_url}/Certificates")
+            response = self.session.get(
+                f"{self.base_url}/Certificates",
+                params=params,
+                timeout=30
+            )
             response.raise_for_status()
             return response.json()
+        except requests.exceptions.RequestException:
+            API_ERRORS.inc()
+            raise
+        finally:
+            PAGE_FETCH_SECONDS.observe(time.perf_counter() - start)
+    
+    def max_certificate_id(self):
+        """Highest certificate Id in Keyfactor, from one sorted single-row page."""
+        # pq.sortAscending=1 sorts descending
+        params = {'pq.pageReturned': 1, 'pq.returnLimit': 1, 'pq.sortField': 'Id', 'pq.sortAscending': 1}
+        try:
+            response = self.session.get(f"{self.base_url}/Certificates", params=params, timeout=30)
+            response.raise_for_status()
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to retrieve certificates: {e}")
-            return []
+            API_ERRORS.inc()
+            logger.error(f"Failed to retrieve the highest certificate Id: {e}")
+            raise
+        certificates = response.json()
+        return certificates[0]['Id'] if certificates else 0
+    
+    def iter_certificate_pages(self, page_size=PAGE_SIZE, prefetch=PREFETCH_PAGES, query=None):
+        """
+        Yield certificate pages in order while up to `prefetch` page requests
+        are in flight. Stops at the first short or empty page; at most
+        `prefetch - 1` speculative requests past the end are discarded.
+        A failed page is logged and re-raised so callers never mistake a
+        partial listing for the full inventory.
+        """
+        with ThreadPoolExecutor(max_workers=prefetch) as executor:
+            pending = deque()
+            next_page = 1
+            for _ in range(prefetch):
+                pending.append((next_page, executor.submit(self.get_page, next_page, page_size, query)))
+                next_page += 1
+            
+            try:
+                while pending:
+                    page, future = pending.popleft()
+                    try:
+                        batch = future.result()
+                    except requests.exceptions.RequestException as e:
+                        logger.error(f"Failed to retrieve certificates (page {page}): {e}")
+                        raise
+                    if batch:
+                        yield batch
+                    if len(batch) < page_size:
+                        return
+                    pending.append((next_page, executor.submit(self.get_page, next_page, page_size, query)))
+                    next_page += 1
+            finally:
+                for _, future in pending:
+                    future.cancel()
     
     def check_expiry(self, cert):
         """Check certificate expiry and return status."""
-        try:
-            expiry = datetime.fromisoformat(cert['NotAfter'].replace('Z', '+00:00'))
-            days_until_expiry = (expiry - datetime.now()).days
-            
-            subject = cert.get('IssuedDN', 'Unknown')
-            
-            if days_until_expiry < 0:
-                logger.error(f"🔴 EXPIRED: {subject} (Expired {-days_until_expiry} days ago)")
-                return 'EXPIRED', days_until_expiry
-            elif days_until_expiry <= CRITICAL_DAYS:
-                logger.error(f"🔴 CRITICAL: {subject} (Expires in {days_until_expiry} days)")
-                return 'CRITICAL', days_until_expiry
-            elif days_until_expiry <= WARNING_DAYS:
-                logger.warning(f"🟡 WARNING: {subject} (Expires in {days_until_expiry} days)")
-                return 'WARNING', days_until_expiry
+        (status, days_until_expiry), = classify_batch([cert], use_numpy=False)
+        log_status(cert, status, days_until_expiry)
+        return status, days_until_expiry
+    
+    def send_alert(self, cert, severity, days_until_expiry, on_delivered=None, on_failed=None):
+        """
+        Queue an alert for the monitoring system. on_delivered or on_failed
+        is called from a sender thread once the webhook accepts the alert
+        or retries run out.
+        """
+        if not self.dispatcher:
+            return False
+        
+        self.dispatcher.submit(alert_payload(cert, severity, days_until_expiry), on_delivered, on_failed)
+        return True
+    
+    def triage(self, certificates, results, counters, alerted, alert_state, now):
+        """
+        Count classification results and yield (cert, status, days) for
+        the certificates to alert on now: at most once per cycle, and only
+        when alert_state says the severity changed or the re-notify
+        interval has passed.
+        """
+        for cert, (status, days) in zip(certificates, results):
+            counters[status] += 1
+            if status == 'OK':
+                alert_state.forget(cert.get('Thumbprint'))
+                continue
+            if status == 'ERROR':
+                log_status(cert, status, days)
+                continue
             
-            return 'OK', days_until_expiry
-        except Exception as e:
-            logger.error(f"Error checking expiry for certificate: {e}")
-            return 'ERROR', None
-    
-    def send_alert(self, cert, severity, days_until_expiry):
-        """Send alert to monitoring system."""
-        if not ALERT_WEBHOOK_URL:
-            return
+            alerted.add(cert['Id'])
+            if not alert_state.should_send(cert.get('Thumbprint'), status, now):
+                counters['SUPPRESSED'] += 1
+                ALERTS_DEDUPLICATED.inc()
+                continue
+            log_status(cert, status, days)
+            yield cert, status, days
+    
+    def process(self, certificates, counters, alerted, alert_state):
+        """
+        Classify certificates as one batch and queue their alerts on the
+        dispatcher, whose threads only do I/O.
+        """
+        certificates = [cert for cert in certificates if cert['Id'] not in alerted]
+        now = time.time()
+        results = classify_batch(certificates, now)
         
-        payload = {
-            'severity': severity,
-            'subject': cert.get('IssuedDN'),
-            'thumbprint': cert.get('Thumbprint'),
-            'daysUntilExpiry': days_until_expiry,
-            'expiryDate': cert.get('NotAfter'),
-            'timestamp': datetime.now().isoformat()
-        }
+        for cert, status, days in self.triage(certificates, results, counters, alerted, alert_state, now):
+            on_delivered = on_failed = None
+            if cert.get('Thumbprint'):
+                on_delivered = functools.partial(alert_state.record, cert['Thumbprint'], status)
+                on_failed = functools.partial(alert_state.record_failure, cert['Thumbprint'])
+            self.send_alert(cert, status, days, on_delivered, on_failed)
         
-        try:
-            response = requests.post(
-                ALERT_WEBHOOK_URL,
-                json=payload,
-                timeout=10
-            )
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to send alert: {e}")
+        CERTIFICATES_CHECKED.inc(len(certificates))
+        return len(certificates)
+    
+    def process_pages(self, query, prepare, counters, alerted, alert_state):
+        """
+        Fetch the pages matching `query`, pass each through `prepare` and
+        process what it returns. Returns the number of certificates checked.
+        """
+        checked = 0
+        # Classify and alert page by page so memory stays bounded by
+        # the pages in flight rather than the whole inventory; alert
+        # sends overlap with fetching the next page
+        for certificates in self.iter_certificate_pages(query=query):
+            checked += self.process(prepare(certificates), counters, alerted, alert_state)
+            logger.info(f"Processed {checked} certificates...")
+        return checked
+    
+    def run_cycle(self, snapshot, alert_state, schedule):
+        """
+        Run one check. A full cycle pages through the whole inventory,
+        prunes the snapshot and rebuilds the crossing schedule; a delta
+        cycle fetches only certificates imported or revoked since the
+        watermark, schedules them, and re-checks snapshot certificates
+        whose re-notify interval is due. Threshold crossings in between
+        are handled by process_crossings. Returns the number of
+        certificates checked.
+        """
+        now = time.time()
+        full = snapshot.needs_full_reconcile(now)
+        counters = dict.fromkeys(STATUSES + ('SUPPRESSED',), 0)
+        alerted = set()
+        
+        if full:
+            logger.info("Running full reconciliation...")
+            generation = int(snapshot.get_state('generation', 0)) + 1
+            query = None
+        else:
+            generation = int(snapshot.get_state('generation'))
+            watermark = float(snapshot.get_state('watermark'))
+            since = datetime.fromtimestamp(watermark, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+            query = f'ImportDate>={since} OR RevocationEffDate>={since}'
+            logger.info(f"Fetching changes since {since}...")
+        
+        queries = [query]
+        if self.membership and full:
+            # Each worker pages only the Id ranges of its own slice (no
+            # ranges means it owns nothing). Certificates imported after
+            # the max Id was read arrive with the next delta.
+            queries = self.membership.queries(self.max_certificate_id())
+        
+        def prepare(certificates):
+            if self.membership:
+                # Delta queries return every worker's changes; they are
+                # small, so each worker keeps its own slice locally
+                certificates = [cert for cert in certificates if self.membership.owns(cert['Id'])]
+            live = snapshot.apply(certificates, generation)
+            if not full:
+                for cert in live:
+                    schedule.add(cert['Id'], parse_not_after(cert.get('NotAfter')), now)
+            return live
+        
+        checked = sum(self.process_pages(query, prepare, counters, alerted, alert_state) for query in queries)
+        
+        if full:
+            removed = snapshot.remove_unseen(generation)
+            if removed:
+                logger.info(f"Removed {removed} certificates no longer in Keyfactor")
+            snapshot.set_state('generation', generation)
+            snapshot.set_state('last_full', now)
+            schedule.rebuild(snapshot, now)
+        else:
+            # Re-notifications that are due, plus alerts earlier cycles failed to deliver
+            due = alert_state.due(now)
+            renotify = list(snapshot.by_thumbprints(due))
+            for thumbprint in set(due) - {cert.get('Thumbprint') for cert in renotify}:
+                alert_state.forget(thumbprint)  # no longer in this worker's inventory
+            checked += self.process(renotify, counters, alerted, alert_state)
+        
+        if self.dispatcher:
+            self.dispatcher.drain()
+        alert_state.flush(now)
+        snapshot.set_state('watermark', now - DELTA_OVERLAP_MINUTES * 60)
+        snapshot.set_state('last_cycle', now)
+        snapshot.conn.commit()
+        
+        total, totals = snapshot.summary(now)
+        for status in STATUSES:
+            CERTIFICATES.set(totals[status], status)
+        CYCLE_SECONDS.observe(time.time() - now)
+        LAST_SUCCESS.set(time.time())
+        
+        # Summary
+        logger.info("=" * 60)
+        logger.info(f"Expiry Check Summary ({'full' if full else 'delta'}, {checked} checked):")
+        logger.info(f"  Total: {total}")
+        logger.info(f"  OK: {totals['OK']}")
+        logger.info(f"  Warning: {totals['WARNING']}")
+        logger.info(f"  Critical: {totals['CRITICAL']}")
+        logger.info(f"  Expired: {totals['EXPIRED']}")
+        logger.info(f"  Errors: {totals['ERROR']}")
+        logger.info(f"  Duplicate alerts suppressed: {counters['SUPPRESSED']}")
+        logger.info("=" * 60)
+        
+        return checked
+    
+    def process_crossings(self, snapshot, alert_state, schedule, due, now):
+        """
+        Re-check the certificates whose scheduled crossing fired and
+        schedule their next one. Entries whose certificate has been
+        revoked, removed or re-imported with another NotAfter are dropped.
+        """
+        counters = dict.fromkeys(STATUSES + ('SUPPRESSED',), 0)
+        crossed = []
+        for cert in snapshot.by_ids(due):
+            not_after = parse_not_after(cert['NotAfter'])
+            if not_after is None or not schedule.is_crossing(not_after, due[cert['Id']]):
+                continue
+            crossed.append(cert)
+            schedule.add(cert['Id'], not_after, due[cert['Id']])
+        
+        self.process(crossed, counters, set(), alert_state)
+        if self.dispatcher:
+            self.dispatcher.drain()
+        # Pruning waits for run_cycle, which first re-notifies what is due
+        alert_state.flush(now, prune=False)
+        snapshot.set_state('last_cycle', now)
+        snapshot.conn.commit()
+        
+        logger.info(f"{len(crossed)} certificates crossed a threshold: "
+                    f"{counters['EXPIRED']} expired, {counters['CRITICAL']} critical, "
+                    f"{counters['WARNING']} warning, {counters['SUPPRESSED']} already alerted")
     
     def monitor_loop(self):
         """Continuous monitoring loop."""
+        snapshot = CertificateSnapshot()
+        alert_state = AlertStateStore()
+        schedule = CrossingSchedule()
+        SCHEDULED_CROSSINGS.set_function(schedule.__len__)
+        # Crossings missed while the monitor was down fire straight away
+        schedule.rebuild(snapshot, float(snapshot.get_state('last_cycle', time.time())))
+        next_poll = 0
+        
+        if SHARD_DIR:
+            self.membership = ShardMembership()
+            self.membership.start()
+        
+        try:
+            self._loop(snapshot, alert_state, schedule, next_poll)
+        finally:
+            if self.membership:
+                self.membership.stop()
+    
+    def _loop(self, snapshot, alert_state, schedule, next_poll):
         while True:
-            logger.info("Starting certificate expiry check...")
+            if self.membership and self.membership.changed.is_set():
+                # Our slice changed: the full reconciliation adopts newly
+                # owned certificates and prunes the ones handed over
+                self.membership.changed.clear()
+                snapshot.request_full_reconcile()
+                next_poll = 0
             
-            certificates = self.get_certificates()
-            logger.info(f"Retrieved {len(certificates)} certificates")
-            
-            if not certificates:
-                logger.warning("No certificates retrieved, sleeping...")
-                time.sleep(CHECK_INTERVAL * 60)
-                continue
+            if time.time() >= next_poll:
+                logger.info("Starting certificate expiry check...")
+                try:
+                    self.run_cycle(snapshot, alert_state, schedule)
+                except requests.exceptions.RequestException:
+                    # Watermark and last_full are left alone, so the next
+                    # cycle retries the same window
+                    logger.warning("Certificate retrieval failed, will retry next poll")
+                next_poll = time.time() + CHECK_INTERVAL * 60
             
-            # Counters
-            counters = {
-                'EXPIRED': 0,
-                'CRITICAL': 0,
-                'WARNING': 0,
-                'OK': 0,
-                'ERROR': 0
-            }
+            now = time.time()
+            due = schedule.pop_due(now)
+            if due:
+                self.process_crossings(snapshot, alert_state, schedule, due, now)
             
-            # Check certificates concurrently
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                future_to_cert = {
-                    executor.submit(self.check_expiry, cert): cert
-                    for cert in certificates
-                }
-                
-                for future in as_completed(future_to_cert):
-                    cert = future_to_cert[future]
-                    try:
-                        status, days = future.result()
-                        counters[status] += 1
-                        
-                        # Send alert for expired or critical
-                        if status in ['EXPIRED', 'CRITICAL', 'WARNING']:
-                            self.send_alert(cert, status, days)
-                    except Exception as e:
-                        logger.error(f"Error processing certificate: {e}")
-                        counters['ERROR'] += 1
+            # Sleep until the next crossing or poll, whichever is first
+            wake = min(next_poll, schedule.next_due() or next_poll)
+            delay = max(wake - time.time(), 0)
+            if delay >= 60:
+                logger.info(f"Sleeping {delay / 60:.1f} minutes "
+                            f"({'threshold crossing' if wake < next_poll else 'next poll'}, "
+                            f"{len(schedule)} crossings scheduled)...")
+            if self.membership:
+                self.membership.changed.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+class AsyncCertificateMonitor(CertificateMonitor):
+    """
+    asyncio engine for monitor_loop (MONITOR_ENGINE=asyncio). Page
+    fetching, classification and alert dispatch run as stages joined by
+    bounded asyncio queues, each with its own concurrency, and each
+    upstream gets a single pooled aiohttp session. Snapshot, alert state,
+    crossing schedule and sharding are shared with the threaded engine.
+    """
+    dispatcher_class = None
+    
+    def __init__(self, hostname, username, password, domain):
+        super().__init__(hostname, username, password, domain)
+        credentials = f"{domain}\\{username}:{password}".encode('utf-8')
+        self.authorization = f"Basic {base64.b64encode(credentials).decode('ascii')}"
+        self.loop = asyncio.new_event_loop()
+        self.keyfactor = None
+        self.webhook = None
+        self.alerts = None
+        ALERT_QUEUE_DEPTH.set_function(lambda: self.alerts.qsize() if self.alerts else 0)
+    
+    async def _open(self):
+        if self.keyfactor is None:
+            self.keyfactor = aiohttp.ClientSession(
+                headers={'Authorization': self.authorization, 'Content-Type': 'application/json'},
+                connector=aiohttp.TCPConnector(limit=ASYNC_FETCH_CONCURRENCY),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        if self.webhook is None and ALERT_WEBHOOK_URL:
+            self.webhook = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=ALERT_CONCURRENCY),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+    
+    def close(self):
+        if self.loop.is_closed():
+            return
+        for session in (self.keyfactor, self.webhook):
+            if session:
+                self.loop.run_until_complete(session.close())
+        self.keyfactor = self.webhook = None
+        self.loop.close()
+    
+    def monitor_loop(self):
+        try:
+            super().monitor_loop()
+        finally:
+            self.close()
+    
+    async def _get_page(self, page, query):
+        params = {'pq.pageReturned': page, 'pq.returnLimit': PAGE_SIZE}
+        if query:
+            params['pq.queryString'] = query
+        start = time.perf_counter()
+        try:
+            async with self.keyfactor.get(f"{self.base_url}/Certificates", params=params) as response:
+                response.raise_for_status()
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            API_ERRORS.inc()
+            logger.error(f"Failed to retrieve certificates (page {page}): {e}")
+            # monitor_loop retries cycles that fail with a RequestException
+            raise requests.exceptions.RequestException(str(e)) from e
+        finally:
+            PAGE_FETCH_SECONDS.observe(time.perf_counter() - start)
+    
+    async def _fetch(self, pages, query):
+        """
+        Fetch stage: workers claim page numbers in order until one sees a
+        short page. Pages may reach the queue out of order, which is fine
+        because everything downstream is keyed by certificate Id.
+        """
+        next_page = 1
+        last_page = None
+        
+        async def worker():
+            nonlocal next_page, last_page
+            while last_page is None or next_page <= last_page:
+                page = next_page
+                next_page += 1
+                batch = await self._get_page(page, query)
+                if len(batch) < PAGE_SIZE:
+                    last_page = page if last_page is None else min(last_page, page)
+                if batch:
+                    await pages.put(batch)
+        
+        workers = [asyncio.create_task(worker()) for _ in range(ASYNC_FETCH_CONCURRENCY)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+    
+    async def _classify(self, pages, prepare, counters, alerted, alert_state):
+        """Classify stage: returns the number of certificates checked."""
+        checked = 0
+        while (batch := await pages.get()) is not None:
+            certificates = [cert for cert in prepare(batch) if cert['Id'] not in alerted]
+            now = time.time()
+            # NumPy releases the GIL for most of this, so stages overlap
+            results = await asyncio.to_thread(classify_batch, certificates, now)
+            for cert, status, days in self.triage(certificates, results, counters, alerted, alert_state, now):
+                if self.webhook:
+                    await self.alerts.put((alert_payload(cert, status, days), cert.get('Thumbprint')))
+            checked += len(certificates)
+            CERTIFICATES_CHECKED.inc(len(certificates))
+        return checked
+    
+    async def _send(self, alert_state):
+        """Dispatch stage: coalesce queued alerts into batches and post them."""
+        while (item := await self.alerts.get()) is not None:
+            batch = [item]
+            while len(batch) < ALERT_BATCH_SIZE:
+                try:
+                    item = self.alerts.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    self.alerts.put_nowait(None)
+                    break
+                batch.append(item)
             
-            # Summary
-            logger.info("=" * 60)
-            logger.info("Expiry Check Summary:")
-            logger.info(f"  Total: {len(certificates)}")
-            logger.info(f"  OK: {counters['OK']}")
-            logger.info(f"  Warning: {counters['WARNING']}")
-            logger.info(f"  Critical: {counters['CRITICAL']}")
-            logger.info(f"  Expired: {counters['EXPIRED']}")
-            logger.info(f"  Errors: {counters['ERROR']}")
-            logger.info("=" * 60)
+            if await self._post([payload for payload, _ in batch]):
+                for payload, thumbprint in batch:
+                    ALERTS_SENT.inc(1, payload['severity'])
+                    if thumbprint:
+                        alert_state.record(thumbprint, payload['severity'])
+            else:
+                ALERTS_FAILED.inc(len(batch))
+                for _, thumbprint in batch:
+                    if thumbprint:
+                        alert_state.record_failure(thumbprint)
+    
+    async def _post(self, payloads):
+        body = payloads[0] if ALERT_BATCH_SIZE <= 1 else payloads
+        for attempt in range(ALERT_MAX_RETRIES + 1):
+            start = time.perf_counter()
+            try:
+                async with self.webhook.post(ALERT_WEBHOOK_URL, json=body) as response:
+                    if response.status != 429 and response.status < 500:
+                        response.raise_for_status()
+                        return True
+                    error = f"HTTP {response.status}"
+            except aiohttp.ClientResponseError as e:
+                # Other 4xx responses will not succeed on retry
+                logger.error(f"Failed to send {len(payloads)} alert(s): {e}")
+                return False
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            finally:
+                ALERT_SEND_SECONDS.observe(time.perf_counter() - start)
             
-            # Sleep until next check
-            logger.info(f"Sleeping for {CHECK_INTERVAL} minutes...")
-            time.sleep(CHECK_INTERVAL * 60)
+            if attempt < ALERT_MAX_RETRIES:
+                await asyncio.sleep(ALERT_RETRY_BACKOFF * 2 ** attempt)
+        
+        logger.error(f"Failed to send {len(payloads)} alert(s) after "
+                     f"{ALERT_MAX_RETRIES + 1} attempts: {error}")
+        return False
+    
+    async def _pipeline(self, source, prepare, counters, alerted, alert_state):
+        """
+        Run the fetch, classify and send stages together. Each stage ends
+        the next by queueing one None per consumer. The first stage to
+        fail cancels the others, so no stage is left blocked on a full
+        queue that nobody drains, and its exception fails the cycle.
+        """
+        await self._open()
+        pages = asyncio.Queue(ASYNC_PAGE_QUEUE_SIZE)
+        self.alerts = asyncio.Queue(ALERT_QUEUE_SIZE)
+        senders = ALERT_CONCURRENCY if self.webhook else 0
+        
+        async def fetch_stage():
+            await source(pages)
+            for _ in range(ASYNC_CLASSIFY_CONCURRENCY):
+                await pages.put(None)
+        
+        async def classify_stage():
+            checked = await asyncio.gather(*(
+                self._classify(pages, prepare, counters, alerted, alert_state)
+                for _ in range(ASYNC_CLASSIFY_CONCURRENCY)
+            ))
+            for _ in range(senders):
+                await self.alerts.put(None)
+            return sum(checked)
+        
+        async def send_stage():
+            await asyncio.gather(*(self._send(alert_state) for _ in range(senders)))
+        
+        stages = [asyncio.create_task(stage()) for stage in (fetch_stage, classify_stage, send_stage)]
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in stages:
+                if task in done and task.exception() is not None:
+                    raise task.exception()
+            return stages[1].result()
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+    
+    def process_pages(self, query, prepare, counters, alerted, alert_state):
+        async def source(pages):
+            await self._fetch(pages, query)
+        
+        checked = self.loop.run_until_complete(
+            self._pipeline(source, prepare, counters, alerted, alert_state))
+        logger.info(f"Processed {checked} certificates...")
+        return checked
+    
+    def process(self, certificates, counters, alerted, alert_state):
+        async def source(pages):
+            await pages.put(list(certificates))
+        
+        return self.loop.run_until_complete(
+            self._pipeline(source, lambda batch: batch, counters, alerted, alert_state))
 
 
 def main():
@@ -164,7 +1388,12 @@ def main():
     logger.info(f"Critical threshold: {CRITICAL_DAYS} days")
     logger.info(f"Check interval: {CHECK_INTERVAL} minutes")
     
-    monitor = CertificateMonitor(
+    if MONITOR_ENGINE == 'asyncio' and aiohttp is None:
+        logger.error("MONITOR_ENGINE=asyncio requires aiohttp (pip install aiohttp)")
+        return 1
+    
+    engine = AsyncCertificateMonitor if MONITOR_ENGINE == 'asyncio' else CertificateMonitor
+    monitor = engine(
         hostname=KEYFACTOR_HOST,
         username=KEYFACTOR_USERNAME,
         password=KEYFACTOR_PASSWORD,
@@ -172,6 +1401,8 @@ def main():
     )
     
     try:
+        if METRICS_PORT:
+            start_metrics_server()
         monitor.monitor_loop()
     except KeyboardInterrupt:
         logger.info("Monitor stopped by user")
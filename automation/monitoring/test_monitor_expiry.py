@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Regression tests for monitor-expiry.py.
+
+Run with: python -m unittest discover -s automation/monitoring
+"""
+
+import importlib.util
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+
+_spec = importlib.util.spec_from_file_location(
+    'monitor_expiry', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitor-expiry.py')
+)
+monitor_expiry = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(monitor_expiry)
+
+
+class InMemoryMonitor(monitor_expiry.CertificateMonitor):
+    """Serves a fixed inventory and delivers (or fails) every alert immediately."""
+
+    dispatcher_class = None
+
+    def __init__(self, certificates):
+        super().__init__('http://keyfactor.invalid', 'user', 'password', 'DOMAIN')
+        self.certificates = certificates
+        self.sent = []
+        self.webhook_down = False
+
+    def get_page(self, page, page_size=monitor_expiry.PAGE_SIZE, query=None):
+        if query:
+            return []  # nothing changed since the watermark
+        return self.certificates[(page - 1) * page_size:page * page_size]
+
+    def send_alert(self, cert, severity, days_until_expiry, on_delivered=None, on_failed=None):
+        if self.webhook_down:
+            if on_failed:
+                on_failed()
+            return True
+        self.sent.append((cert['Thumbprint'], severity))
+        if on_delivered:
+            on_delivered()
+        return True
+
+
+def _certificate(cert_id, not_after):
+    return {
+        'Id': cert_id,
+        'Thumbprint': f"{cert_id:040X}",
+        'IssuedDN': f"CN=host{cert_id}.contoso.com",
+        'NotAfter': not_after.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+
+class MonitorStateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot = monitor_expiry.CertificateSnapshot(os.path.join(self.directory.name, 'snapshot.db'))
+        self.alert_state = monitor_expiry.AlertStateStore(os.path.join(self.directory.name, 'alerts.db'))
+        self.schedule = monitor_expiry.CrossingSchedule()
+
+    def tearDown(self):
+        self.snapshot.conn.close()
+        self.alert_state.conn.close()
+        self.directory.cleanup()
+
+    def test_crossing_does_not_drop_due_renotifications(self):
+        now = datetime.now(timezone.utc)
+        # 357 WARNING certificates plus one whose CRITICAL crossing is a minute away
+        certificates = [_certificate(i, now + timedelta(days=20)) for i in range(357)]
+        certificates.append(_certificate(357, now + timedelta(days=monitor_expiry.CRITICAL_DAYS + 1, minutes=1)))
+        monitor = InMemoryMonitor(certificates)
+
+        monitor.run_cycle(self.snapshot, self.alert_state, self.schedule)
+        self.assertEqual(len(monitor.sent), 358)
+
+        # Every alert is now past its re-notify interval
+        sent_at = time.time() - (monitor_expiry.RENOTIFY_HOURS + 1) * 3600
+        for cert in certificates:
+            self.alert_state.record(cert['Thumbprint'], 'WARNING', sent_at)
+
+        monitor.sent.clear()
+        due = self.schedule.pop_due(time.time() + 120)
+        self.assertIn(357, due)
+        monitor.process_crossings(self.snapshot, self.alert_state, self.schedule, due, time.time())
+        self.assertEqual(monitor.sent, [(certificates[357]['Thumbprint'], 'WARNING')])
+
+        monitor.sent.clear()
+        monitor.run_cycle(self.snapshot, self.alert_state, self.schedule)
+        self.assertEqual(sorted(thumbprint for thumbprint, _ in monitor.sent),
+                         sorted(cert['Thumbprint'] for cert in certificates[:357]))
+        self.assertEqual(len(self.alert_state.due(time.time())), 0)
+
+    
+    def test_undelivered_alerts_are_retried_next_cycle(self):
+        now = datetime.now(timezone.utc)
+        certificates = [_certificate(i, now + timedelta(days=20)) for i in range(5)]
+        monitor = InMemoryMonitor(certificates)
+        # The first two were notified long ago, so this cycle re-notifies them
+        sent_at = time.time() - (monitor_expiry.RENOTIFY_HOURS + 1) * 3600
+        for cert in certificates[:2]:
+            self.alert_state.record(cert['Thumbprint'], 'WARNING', sent_at)
+        
+        monitor.webhook_down = True
+        monitor.run_cycle(self.snapshot, self.alert_state, self.schedule)
+        self.assertEqual(monitor.sent, [])
+        
+        # The delta query returns nothing, so only the alert state can bring them back
+        monitor.webhook_down = False
+        monitor.run_cycle(self.snapshot, self.alert_state, self.schedule)
+        self.assertEqual(sorted(thumbprint for thumbprint, _ in monitor.sent),
+                         sorted(cert['Thumbprint'] for cert in certificates))
+        self.assertEqual(self.alert_state.due(time.time()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
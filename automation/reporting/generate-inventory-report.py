@@ -6,10 +6,16 @@ Generates detailed reports of all certificates managed by Keyfactor.
 
 import requests
 import pandas as pd
-from datetime import datetime, timedelta
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+import gzip
+import json
 import os
+import re
+import shutil
 import sys
 import logging
+import time
 
 # Configuration
 KEYFACTOR_HOST = os.environ.get('KEYFACTOR_HOST')
@@ -18,102 +24,848 @@ KEYFACTOR_PASSWORD = os.environ.get('KEYFACTOR_PASSWORD')
 KEYFACTOR_DOMAIN = os.environ.get('KEYFACTOR_DOMAIN', 'CONTOSO')
 
 REPORT_OUTPUT_DIR = '/var/reports/keyfactor'
+REPORT_FORMATS = os.environ.get('REPORT_FORMATS', 'xlsx')  # xlsx, csv, parquet, jsonl
+REPORT_DEFINITIONS = os.environ.get('REPORT_DEFINITIONS', 'summary,all,expiring:30,by-issuer')
+OWNER_TEAM_FIELD = os.environ.get('REPORT_OWNER_TEAM_FIELD', 'Team')  # certificate metadata field
+
+# Adaptive pager: page sizes are REPORT_MIN_PAGE_SIZE * 2^k up to the maximum
+PAGE_SIZE = int(os.environ.get('REPORT_PAGE_SIZE', 1000))  # starting page size
+MIN_PAGE_SIZE = int(os.environ.get('REPORT_MIN_PAGE_SIZE', 250))
+MAX_PAGE_SIZE = int(os.environ.get('REPORT_MAX_PAGE_SIZE', 4000))
+MAX_CONCURRENCY = int(os.environ.get('REPORT_MAX_CONCURRENCY', 8))  # page requests in flight
+TARGET_PAGE_SECS = float(os.environ.get('REPORT_TARGET_PAGE_SECS', 2.0))
+MAX_RETRIES = int(os.environ.get('REPORT_MAX_RETRIES', 5))
+
+SNAPSHOT_DIR = os.environ.get('REPORT_SNAPSHOT_DIR', '/var/lib/keyfactor/inventory-snapshot')
+SNAPSHOT_FULL_REFRESH_DAYS = int(os.environ.get('REPORT_FULL_REFRESH_DAYS', 7))  # drops deleted certificates
+DELTA_OVERLAP_MINUTES = int(os.environ.get('DELTA_OVERLAP_MINUTES', 10))  # clock skew allowance
+
+# Columns kept in the snapshot; timestamps are stored as naive UTC.
+# OwnerTeam and Stores are flattened from the certificate metadata and
+# locations, Stores as "machine:path" entries joined by STORE_SEPARATOR
+SNAPSHOT_COLUMNS = ['Id', 'Thumbprint', 'SerialNumber', 'IssuedDN', 'IssuerDN',
+                    'NotBefore', 'NotAfter', 'ImportDate', 'RevocationEffDate',
+                    'OwnerTeam', 'Stores']
+TIMESTAMP_COLUMNS = ['NotBefore', 'NotAfter', 'ImportDate', 'RevocationEffDate']
+STRING_DTYPES = {'Thumbprint': 'string[pyarrow]', 'SerialNumber': 'string[pyarrow]',
+                 'IssuedDN': 'string[pyarrow]', 'IssuerDN': 'string[pyarrow]',
+                 'OwnerTeam': 'string[pyarrow]', 'Stores': 'string[pyarrow]'}
+CATEGORY_COLUMNS = ['IssuerDN', 'OwnerTeam']  # few distinct values; applied once pages are combined
+STORE_SEPARATOR = ';'
+
+# Private key details are never needed. Metadata and locations are only
+# requested while the snapshot keeps OwnerTeam or Stores, which is when a
+# selected report reads them; they are reduced to those columns at ingest
+CERTIFICATE_PROJECTION = {
+    'pq.includeLocations': 'false',
+    'pq.includeMetadata': 'false',
+    'pq.includeHasPrivateKey': 'false',
+}
+ENRICHED_COLUMNS = {'OwnerTeam': 'pq.includeMetadata', 'Stores': 'pq.includeLocations'}
+
+STATUS_BINS = [-float('inf'), 0, 7, 30, 90, float('inf')]
+STATUS_LABELS = ['Expired', 'Critical (< 7 days)', 'Warning (< 30 days)', 'Attention (< 90 days)', 'OK']
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def utcnow():
+    """Current time as naive UTC, matching the snapshot timestamps."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _owner_team(metadata):
+    return metadata.get(OWNER_TEAM_FIELD) if isinstance(metadata, dict) else None
+
+
+def _store_names(locations):
+    if not isinstance(locations, list) or not locations:
+        return None
+    return STORE_SEPARATOR.join(
+        f"{location.get('StoreMachine', '')}:{location.get('StorePath', '')}" for location in locations
+    )
+
+
+def classify_expiry(df, now):
+    """Add DaysUntilExpiry and Status to snapshot rows, renamed for reporting."""
+    days = (df['NotAfter'] - now).dt.days
+    df['DaysUntilExpiry'] = days.astype('Int32' if days.isna().any() else 'int32')
+    df['Status'] = pd.cut(df['DaysUntilExpiry'], bins=STATUS_BINS, labels=STATUS_LABELS)
+    return df.rename(columns={'IssuedDN': 'Subject', 'NotAfter': 'Expiry'})
+
+
+class InventorySnapshot:
+    """
+    Local columnar copy of the inventory: one Parquet file per issue month
+    under <version>/issued=YYYY-MM/, plus a small state file holding the
+    delta watermark and the current version. Refreshes only rewrite the
+    months that received changes; a full export is written as a new
+    version and swapped in by replacing the state file.
+    """
+    
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        self.state_path = os.path.join(directory, '_state.json')
+    
+    def load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+    
+    def save_state(self, state):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+    
+    def exists(self):
+        return bool(self.load_state())
+    
+    def data_directory(self, state=None):
+        state = self.load_state() if state is None else state
+        # Snapshots written before versioning keep their partitions at the top level
+        return os.path.join(self.directory, state['version']) if 'version' in state else self.directory
+    
+    def enriched_columns(self, state=None):
+        """ENRICHED_COLUMNS the snapshot holds; older snapshots always fetched both."""
+        state = self.load_state() if state is None else state
+        return state.get('enriched', list(ENRICHED_COLUMNS))
+    
+    def needs_full_refresh(self, now):
+        state = self.load_state()
+        last_full = state.get('last_full')
+        # A snapshot written with other columns or without a version is re-exported once
+        if (last_full is None or 'version' not in state
+                or state.get('columns', SNAPSHOT_COLUMNS[:9]) != SNAPSHOT_COLUMNS):
+            return True
+        return now - datetime.fromisoformat(last_full) >= timedelta(days=SNAPSHOT_FULL_REFRESH_DAYS)
+    
+    @staticmethod
+    def to_frame(certificates):
+        """Project API records onto the snapshot columns with compact dtypes."""
+        df = pd.DataFrame.from_records(certificates, columns=SNAPSHOT_COLUMNS[:9] + ['Metadata', 'Locations'])
+        df['OwnerTeam'] = df.pop('Metadata').map(_owner_team)
+        df['Stores'] = df.pop('Locations').map(_store_names)
+        for column in TIMESTAMP_COLUMNS:
+            df[column] = pd.to_datetime(df[column], utc=True, errors='coerce').dt.tz_localize(None)
+        return df.astype({'Id': 'int64', **STRING_DTYPES})
+    
+    @staticmethod
+    def compact(df):
+        """Turn low-cardinality columns into categoricals after combining frames."""
+        return df.astype({column: 'category' for column in CATEGORY_COLUMNS if column in df})
+    
+    @staticmethod
+    def partition_keys(df):
+        return df['NotBefore'].dt.strftime('%Y-%m').fillna('unknown')
+    
+    def _write_partition(self, directory, month, df):
+        partition = os.path.join(directory, f"issued={month}")
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, 'part-0.parquet')
+        df.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+    
+    def replace_all(self, df, now, enriched=()):
+        """Write a full export, minus revoked certificates, as a new version and swap it in."""
+        df = self.compact(df[df['RevocationEffDate'].isna()])
+        version = f"snapshot-{now:%Y%m%dT%H%M%S%f}"
+        os.makedirs(os.path.join(self.directory, version))
+        for month, part in df.groupby(self.partition_keys(df), sort=False):
+            self._write_partition(os.path.join(self.directory, version), month, part)
+        
+        # Replacing the state file is the swap: readers see the old version or the new one
+        self.save_state({'last_full': now.isoformat(), 'watermark': now.isoformat(),
+                         'columns': SNAPSHOT_COLUMNS, 'version': version, 'enriched': list(enriched)})
+        for entry in os.listdir(self.directory):
+            if entry != version and entry.startswith(('snapshot-', 'issued=')):
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+    
+    def upsert(self, df, now):
+        """
+        Merge changed certificates into the months they were issued in.
+        Revoked certificates are dropped rather than stored.
+        """
+        state = self.load_state()
+        directory = self.data_directory(state)
+        for month, part in df.groupby(self.partition_keys(df), sort=False):
+            path = os.path.join(directory, f"issued={month}", 'part-0.parquet')
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+                part = part.drop_duplicates('Id', keep='last')
+            self._write_partition(directory, month, part[part['RevocationEffDate'].isna()])
+        
+        state['watermark'] = now.isoformat()
+        self.save_state(state)
+    
+    def _partition_paths(self):
+        directory = self.data_directory()
+        if not os.path.isdir(directory):
+            return []
+        return [
+            os.path.join(directory, entry, 'part-0.parquet')
+            for entry in sorted(os.listdir(directory))
+            if entry.startswith('issued=')
+        ]
+    
+    def iter_partitions(self, columns=None):
+        """
+        Yield the snapshot one issue month at a time (a single empty frame
+        if there is none). Columns missing from older files come back null.
+        """
+        import pyarrow.parquet as pq
+        
+        columns = columns or SNAPSHOT_COLUMNS
+        paths = self._partition_paths()
+        if not paths:
+            yield self.compact(self.to_frame([])[columns])
+        for path in paths:
+            present = set(pq.read_schema(path).names)
+            yield pd.read_parquet(path, columns=[c for c in columns if c in present]).reindex(columns=columns)
+
+
+class StreamingExcelWriter:
+    """
+    XLSX writer built on openpyxl's write-only mode: rows are serialized
+    to temp-file backed sheets as they arrive, so memory stays flat no
+    matter how many rows are written. A sheet that reaches Excel's row
+    limit continues in "<name> (2)", "<name> (3)" and so on. Writing to
+    a name again appends to its sheet.
+    """
+    
+    MAX_ROWS = 1_048_576  # including the header row
+    CHUNK_ROWS = 10_000
+    suffix = '.xlsx'
+    
+    def __init__(self, path, max_rows=MAX_ROWS):
+        from openpyxl import Workbook
+        self.path = path
+        self.paths = [path]
+        self.max_rows = max_rows
+        self.workbook = Workbook(write_only=True)
+        self._sheets = {}  # name -> (current sheet, rows used, part number)
+        self._names = {}  # sheet title -> table name
+        self._order = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def order(self, names):
+        """Arrange sheets by table name on save rather than by first write."""
+        self._order = list(names)
+    
+    def close(self):
+        if self._order:
+            rank = {name: i for i, name in enumerate(self._order)}
+            # Write-only workbooks have no public reordering; the sort is stable
+            self.workbook._sheets.sort(key=lambda sheet: rank.get(self._names[sheet.title], len(rank)))
+        self.workbook.save(self.path)
+    
+    def write_rows(self, name, header, rows):
+        """Write an iterable of row tuples, rolling over to new sheets as needed."""
+        sheet, used, part = self._sheets.get(name, (None, 0, 0))
+        for row in rows:
+            if sheet is None or used == self.max_rows:
+                part += 1
+                # Sheet titles are limited to 31 characters
+                title = name[:31] if part == 1 else f"{name[:25]} ({part})"
+                sheet = self.workbook.create_sheet(title)
+                sheet.append(header)
+                self._names[sheet.title] = name
+                used = 1
+            sheet.append(row)
+            used += 1
+        if sheet is None:
+            sheet, used, part = self.workbook.create_sheet(name[:31]), 1, 1
+            sheet.append(header)
+            self._names[sheet.title] = name
+        self._sheets[name] = (sheet, used, part)
+    
+    def write_frame(self, name, frame, index=False):
+        """Stream a DataFrame, converting it a chunk at a time."""
+        if index:
+            frame = frame.reset_index().rename(columns={'index': ''})
+        self.write_rows(name, [str(column) for column in frame.columns], self._frame_rows(frame))
+    
+    def _frame_rows(self, frame):
+        for start in range(0, len(frame), self.CHUNK_ROWS):
+            chunk = frame.iloc[start:start + self.CHUNK_ROWS].astype(object)
+            # NaN/NaT become empty cells
+            chunk = chunk.where(chunk.notna(), None)
+            yield from chunk.itertuples(index=False, name=None)
+
+
+class TableFileWriter:
+    """
+    Base for formats that hold one table per file: a writer opened on
+    "inventory.csv.gz" writes table "By Issuer" to "inventory-by-issuer.csv.gz".
+    Frames are written a chunk at a time and appended to their table's file.
+    """
+    
+    CHUNK_ROWS = 50_000
+    suffix = ''
+    
+    def __init__(self, path):
+        self.base = path[:-len(self.suffix)] if self.suffix else path
+        self.paths = []
+        self._tables = {}  # name -> open handle
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def order(self, names):
+        """Tables are separate files, so there is nothing to arrange."""
+    
+    def close(self):
+        for handle in self._tables.values():
+            handle.close()
+        self._tables.clear()
+    
+    def table_path(self, name):
+        return f"{self.base}-{re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')}{self.suffix}"
+    
+    def write_frame(self, name, frame, index=False):
+        if index:
+            frame = frame.reset_index()
+        handle = self._tables.get(name)
+        if handle is None:
+            path = self.table_path(name)
+            handle = self._tables[name] = self._open(path, frame)
+            self.paths.append(path)
+        for start in range(0, len(frame), self.CHUNK_ROWS):
+            self._write(handle, frame.iloc[start:start + self.CHUNK_ROWS])
+    
+    def _open(self, path, frame):
+        raise NotImplementedError
+    
+    def _write(self, handle, chunk):
+        raise NotImplementedError
+
+
+class GzipCsvWriter(TableFileWriter):
+    suffix = '.csv.gz'
+    
+    def _open(self, path, frame):
+        handle = gzip.open(path, 'wt', newline='', compresslevel=6)
+        frame.iloc[:0].to_csv(handle, index=False)
+        return handle
+    
+    def _write(self, handle, chunk):
+        chunk.to_csv(handle, index=False, header=False)
+
+
+class JsonLinesWriter(TableFileWriter):
+    suffix = '.jsonl'
+    
+    def _open(self, path, frame):
+        return open(path, 'w')
+    
+    def _write(self, handle, chunk):
+        chunk.to_json(handle, orient='records', lines=True, date_format='iso')
+
+
+class ParquetTableWriter(TableFileWriter):
+    suffix = '.parquet'
+    
+    @staticmethod
+    def _plain(frame):
+        # Each chunk's categoricals carry their own categories, which would
+        # not match the file schema; Parquet dictionary-encodes strings anyway
+        return frame.astype({c: 'string[pyarrow]' for c in frame.columns if isinstance(frame[c].dtype, pd.CategoricalDtype)})
+    
+    def _open(self, path, frame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.Schema.from_pandas(self._plain(frame.iloc[:0]), preserve_index=False)
+        return pq.ParquetWriter(path, schema)
+    
+    def _write(self, handle, chunk):
+        import pyarrow as pa
+        handle.write_table(pa.Table.from_pandas(self._plain(chunk), schema=handle.schema, preserve_index=False))
+
+
+OUTPUT_FORMATS = {
+    'xlsx': StreamingExcelWriter,
+    'csv': GzipCsvWriter,
+    'parquet': ParquetTableWriter,
+    'jsonl': JsonLinesWriter,
+}
+
+
+class Report:
+    """
+    A report definition. The snapshot is streamed through every selected
+    report in one pass, a partition at a time; feed() and finish() return
+    (table name, frame) pairs that go to every output format.
+    """
+    
+    columns = ()  # snapshot columns needed besides NotAfter
+    table = None
+    
+    def feed(self, chunk):
+        return []
+    
+    def finish(self):
+        return []
+
+
+class SummaryReport(Report):
+    """Certificate counts by expiry status."""
+    
+    table = 'Summary'
+    
+    def __init__(self):
+        self.counts = pd.Series(0, index=STATUS_LABELS)
+    
+    def feed(self, chunk):
+        self.counts = self.counts.add(chunk['Status'].value_counts(), fill_value=0).reindex(STATUS_LABELS)
+        return []
+    
+    def finish(self):
+        counts = self.counts.astype('int64').rename_axis('Status').reset_index(name='Count')
+        return [(self.table, counts)]
+
+
+class InventoryReport(Report):
+    """Every certificate, streamed straight through."""
+    
+    columns = ('IssuedDN', 'Thumbprint')
+    table = 'All Certificates'
+    
+    def feed(self, chunk):
+        return [(self.table, chunk[['Subject', 'Thumbprint', 'Expiry', 'DaysUntilExpiry', 'Status']])]
+
+
+class ExpiringReport(Report):
+    """Certificates expiring within N days (default 30), soonest first."""
+    
+    columns = ('IssuedDN',)
+    
+    def __init__(self, days=30):
+        self.days = int(days)
+        self.table = 'Expiring Soon' if self.days == 30 else f"Expiring Within {self.days} Days"
+        self.matches = []
+    
+    def feed(self, chunk):
+        due = chunk['DaysUntilExpiry'].le(self.days).fillna(False)
+        self.matches.append(chunk.loc[due, ['Subject', 'Expiry', 'DaysUntilExpiry']])
+        return []
+    
+    def finish(self):
+        expiring = pd.concat(self.matches, ignore_index=True).sort_values('DaysUntilExpiry', kind='stable')
+        return [(self.table, expiring)]
+
+
+class GroupReport(Report):
+    """Certificate counts per value of a column, e.g. per issuer."""
+    
+    def __init__(self, table, column, label=None, split=False):
+        self.table = table
+        self.columns = (column,)
+        self.label = label or column
+        self.split = split  # column holds STORE_SEPARATOR-joined values
+        self.counts = None
+    
+    def feed(self, chunk):
+        keys = chunk[self.columns[0]].astype('string').fillna('(none)')
+        if self.split:
+            keys = keys.str.split(STORE_SEPARATOR).explode()
+        counts = keys.value_counts()
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+        return []
+    
+    def finish(self):
+        counts = self.counts.astype('int64').sort_index().rename_axis(self.label).reset_index(name='Count')
+        return [(self.table, counts)]
+
+
+REPORTS = {
+    'summary': SummaryReport,
+    'all': InventoryReport,
+    'expiring': ExpiringReport,  # expiring:N for a window of N days
+    'by-issuer': lambda: GroupReport('By Issuer', 'IssuerDN'),
+    'by-owner-team': lambda: GroupReport('By Owner Team', 'OwnerTeam'),
+    'by-store': lambda: GroupReport('By Store', 'Stores', label='Store', split=True),
+}
+PARAMETERIZED_REPORTS = {'expiring'}
+
+
+def parse_reports(spec):
+    """Build reports from a comma-separated list such as "by-issuer,expiring:60"."""
+    reports = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, argument = item.partition(':')
+        if name not in REPORTS:
+            raise ValueError(f"Unknown report '{name}' (choose from {', '.join(REPORTS)})")
+        if argument and name not in PARAMETERIZED_REPORTS:
+            raise ValueError(f"Report '{name}' takes no argument")
+        reports.append(REPORTS[name](argument) if argument else REPORTS[name]())
+    return reports
+
+
+def report_columns(reports):
+    """Snapshot columns the given reports read."""
+    needed = {'NotAfter', *(column for report in reports for column in report.columns)}
+    return [column for column in SNAPSHOT_COLUMNS if column in needed]
+
+
+def parse_formats(spec):
+    formats = [part.strip() for part in spec.split(',') if part.strip()]
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown output format '{unknown[0]}' (choose from {', '.join(OUTPUT_FORMATS)})")
+    return formats
+
+
+class RetryableResponse(requests.exceptions.RequestException):
+    """429 or 5xx from Keyfactor; retry_after comes from the Retry-After header."""
+    
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdaptivePager:
+    """
+    Fetches certificate pages concurrently and yields them in offset order.
+    
+    The listing is cut into windows of (offset, size) with sizes of
+    MIN_PAGE_SIZE * 2^k, so a window of any size maps onto a whole
+    Keyfactor page. Fast pages grow the page size and concurrency; pages
+    slower than TARGET_PAGE_SECS shrink the page size; 429/5xx responses
+    halve concurrency and are retried with backoff, split into smaller
+    windows unless the server asked us to slow down. The end is found
+    from an x-total-count header when the server sends one, otherwise
+    from the first short page, and speculative windows past it are
+    discarded.
+    """
+    
+    def __init__(self, fetch, page_size=PAGE_SIZE, min_size=MIN_PAGE_SIZE, max_size=MAX_PAGE_SIZE,
+                 max_concurrency=MAX_CONCURRENCY, target_secs=TARGET_PAGE_SECS, max_retries=MAX_RETRIES):
+        self.fetch = fetch
+        self.min_size = min_size
+        self.max_size = max_size
+        self.page_size = self._clamp(page_size)
+        self.max_concurrency = max_concurrency
+        self.concurrency = max(1, max_concurrency // 2)
+        self.target_secs = target_secs
+        self.max_retries = max_retries
+    
+    def _clamp(self, size):
+        clamped = self.min_size
+        while clamped * 2 <= min(size, self.max_size):
+            clamped *= 2
+        return clamped
+    
+    def _window_size(self, offset):
+        # Largest allowed size that keeps the window aligned to a page
+        size = self.page_size
+        while offset % size:
+            size //= 2
+        return size
+    
+    def _adapt(self, elapsed):
+        if elapsed > self.target_secs:
+            self.page_size = self._clamp(self.page_size // 2)
+        elif elapsed < self.target_secs / 2:
+            self.page_size = self._clamp(self.page_size * 2)
+            self.concurrency = min(self.concurrency + 1, self.max_concurrency)
+    
+    def __iter__(self):
+        cursor = 0          # next offset to schedule
+        end = None          # total certificates, once known
+        emitted = 0         # next offset to yield
+        sizes = {}          # offset -> window size, for every scheduled window
+        ready = {}          # offset -> records, fetched but not yet yielded
+        retries = []        # (not_before, offset, size, attempt)
+        inflight = {}
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            try:
+                while end is None or emitted < end:
+                    now = time.monotonic()
+                    while len(inflight) < self.concurrency:
+                        due = [retry for retry in retries if retry[0] <= now]
+                        if due:
+                            retries.remove(due[0])
+                            _, offset, size, attempt = due[0]
+                        elif end is None or cursor < end:
+                            offset, size, attempt = cursor, self._window_size(cursor), 0
+                            cursor += size
+                        else:
+                            break
+                        sizes[offset] = size
+                        inflight[executor.submit(self.fetch, offset, size)] = (offset, size, attempt)
+                    
+                    if not inflight and not retries:
+                        break
+                    timeout = None
+                    if retries:
+                        timeout = max(min(retry[0] for retry in retries) - now, 0)
+                    done, _ = wait(inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    
+                    for future in done:
+                        offset, size, attempt = inflight.pop(future)
+                        if end is not None and offset >= end:
+                            continue
+                        try:
+                            records, total, elapsed = future.result()
+                        except requests.exceptions.RequestException as e:
+                            status = getattr(e, 'status', None)
+                            if isinstance(e, requests.exceptions.HTTPError) or attempt >= self.max_retries:
+                                raise
+                            self.concurrency = max(1, self.concurrency // 2)
+                            delay = getattr(e, 'retry_after', None) or 2 ** attempt
+                            not_before = time.monotonic() + delay
+                            logger.warning(f"Page at offset {offset} failed ({e}), retrying in {delay}s "
+                                           f"with {self.concurrency} in flight")
+                            if status != 429 and size > self.min_size:
+                                # Overloaded or timing out: ask for less at once
+                                self.page_size = self._clamp(size // 2)
+                                half = size // 2
+                                del sizes[offset]
+                                retries.append((not_before, offset, half, attempt + 1))
+                                retries.append((not_before, offset + half, half, attempt + 1))
+                            else:
+                                retries.append((not_before, offset, size, attempt + 1))
+                            continue
+                        
+                        self._adapt(elapsed)
+                        if total is not None:
+                            end = total if end is None else min(end, total)
+                        if len(records) < size:
+                            end = offset + len(records) if end is None else min(end, offset + len(records))
+                        ready[offset] = records
+                    
+                    # Yield every contiguous window from the front
+                    while emitted in ready:
+                        records = ready.pop(emitted)
+                        emitted += sizes.pop(emitted)
+                        if records:
+                            yield records
+                    
+                    if end is not None:
+                        retries = [retry for retry in retries if retry[1] < end]
+            finally:
+                for future in inflight:
+                    future.cancel()
+
+
 class KeyfactorReporter:
     def __init__(self, hostname, username, password, domain):
         self.base_url = f"{hostname}/KeyfactorAPI"
         self.session = requests.Session()
         self.session.auth = (f"{domain}\\{username}", password)
         self.session.headers.update({'Content-Type': 'application/json'})
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENCY)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
-    def get_all_certificates(self):
-        """Retrieve all certificates."""
-        certs = []
-        page = 1
-        page_size = 1000
+    def get_window(self, offset, size, query=None, enriched=()):
+        """
+        Fetch the page covering certificates [offset, offset + size), with
+        the details behind the `enriched` columns.
+        Returns (records, total count if reported, elapsed seconds).
+        """
+        params = {
+            'pq.pageReturned': offset // size + 1,
+            'pq.returnLimit': size,
+            **CERTIFICATE_PROJECTION,
+            **{ENRICHED_COLUMNS[column]: 'true' for column in enriched}
+        }
+        if query:
+            params['pq.queryString'] = query
         
-        while True:
-            params = {
-                'pq.pageReturned': page,
-                'pq.returnLimit': page_size
-            }
-            
-            response = self.session.get(f"{self.base_url}/Certificates", params=params)
-            response.raise_for_status()
-            
-            batch = response.json()
-            if not batch:
-                break
-            
-            certs.extend(batch)
-            page += 1
-            
-            logger.info(f"Retrieved {len(certs)} certificates...")
+        start = time.monotonic()
+        response = self.session.get(f"{self.base_url}/Certificates", params=params, timeout=120)
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get('Retry-After')
+            raise RetryableResponse(
+                response.status_code,
+                float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        response.raise_for_status()
         
-        return certs
+        total = response.headers.get('x-total-count')
+        return response.json(), int(total) if total else None, time.monotonic() - start
     
-    def generate_inventory_report(self):
-        """Generate inventory report."""
-        logger.info("Generating inventory report...")
+    def get_certificate_frame(self, query=None, enriched=()):
+        """
+        Retrieve all certificates, or those matching a Keyfactor query.
+        Each page is projected into a typed frame as it arrives, so full
+        API payloads never accumulate.
+        """
+        frames = []
+        total = 0
+        pager = AdaptivePager(lambda offset, size: self.get_window(offset, size, query, enriched))
         
-        certificates = self.get_all_certificates()
-        logger.info(f"Total certificates: {len(certificates)}")
+        for batch in pager:
+            frames.append(InventorySnapshot.to_frame(batch))
+            total += len(batch)
+            logger.info(f"Retrieved {total} certificates "
+                        f"(page size {pager.page_size}, {pager.concurrency} in flight)...")
         
-        # Convert to DataFrame
-        df = pd.DataFrame(certificates)
-        
-        # Extract key fields
-        df['Subject'] = df['IssuedDN']
-        df['Expiry'] = pd.to_datetime(df['NotAfter'])
-        df['DaysUntilExpiry'] = (df['Expiry'] - datetime.now()).dt.days
+        if not frames:
+            return InventorySnapshot.to_frame([])
+        return pd.concat(frames, ignore_index=True)
+    
+    def refresh_snapshot(self, snapshot, full=False, columns=()):
+        """
+        Bring the local snapshot up to date. A full refresh re-exports the
+        inventory (dropping deleted certificates) with only the enriched
+        `columns` the reports need. A snapshot lacking one of them is
+        re-exported with it added. Otherwise only certificates imported or
+        revoked since the watermark are fetched, with the enriched columns
+        already held.
+        """
+        now = utcnow()
+        needed = [column for column in ENRICHED_COLUMNS if column in columns]
+        held = snapshot.enriched_columns()
+        periodic = full or snapshot.needs_full_refresh(now)
+        if periodic or not set(needed) <= set(held):
+            # A periodic re-export drops details no selected report reads
+            enriched = needed if periodic else [column for column in ENRICHED_COLUMNS
+                                                if column in needed or column in held]
+            logger.info("Full snapshot refresh...")
+            certificates = self.get_certificate_frame(enriched=enriched)
+            snapshot.replace_all(certificates, now, enriched)
+            logger.info(f"Snapshot rebuilt with {len(certificates)} certificates")
+            return
         
-        # Categorize by expiry
-        df['Status'] = pd.cut(
-            df['DaysUntilExpiry'],
-            bins=[-float('inf'), 0, 7, 30, 90, float('inf')],
-            labels=['Expired', 'Critical (< 7 days)', 'Warning (< 30 days)', 'Attention (< 90 days)', 'OK']
-        )
+        watermark = datetime.fromisoformat(snapshot.load_state()['watermark'])
+        since = (watermark - timedelta(minutes=DELTA_OVERLAP_MINUTES)).strftime('%Y-%m-%dT%H:%M:%S')
+        certificates = self.get_certificate_frame(query=f'ImportDate>={since} OR RevocationEffDate>={since}',
+                                                  enriched=held)
+        snapshot.upsert(certificates, now)
+        logger.info(f"Snapshot updated with {len(certificates)} changed certificates since {since}")
+    
+    def generate_inventory_report(self, snapshot=None, reports=None, formats=None):
+        """
+        Generate the selected reports from the local snapshot in every
+        selected format, reading the snapshot once. Returns the files written.
+        """
+        logger.info("Generating inventory report...")
         
-        # Generate summary
-        summary = df['Status'].value_counts().to_dict()
+        snapshot = snapshot or InventorySnapshot()
+        reports = reports if reports is not None else parse_reports(REPORT_DEFINITIONS)
+        formats = formats or parse_formats(REPORT_FORMATS)
+        columns = report_columns(reports)
+        missing = [column for column in columns
+                   if column in ENRICHED_COLUMNS and column not in snapshot.enriched_columns()]
+        if missing:
+            logger.warning(f"Snapshot has no {', '.join(missing)} data; run without --offline to add it")
         
-        # Save detailed report
         timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-        output_file = f"{REPORT_OUTPUT_DIR}/inventory-{timestamp}.xlsx"
+        base = f"{REPORT_OUTPUT_DIR}/inventory-{timestamp}"
+        writers = [OUTPUT_FORMATS[fmt](f"{base}{OUTPUT_FORMATS[fmt].suffix}") for fmt in formats]
+        for writer in writers:
+            writer.order(report.table for report in reports)
         
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            # Summary sheet
-            summary_df = pd.DataFrame.from_dict(summary, orient='index', columns=['Count'])
-            summary_df.to_excel(writer, sheet_name='Summary')
-            
-            # All certificates
-            df[['Subject', 'Thumbprint', 'Expiry', 'DaysUntilExpiry', 'Status']].to_excel(
-                writer, sheet_name='All Certificates', index=False
-            )
-            
-            # Expiring soon
-            expiring = df[df['DaysUntilExpiry'] <= 30].sort_values('DaysUntilExpiry')
-            expiring[['Subject', 'Expiry', 'DaysUntilExpiry']].to_excel(
-                writer, sheet_name='Expiring Soon', index=False
-            )
-            
-            # By issuer
-            issuer_summary = df.groupby('IssuerDN').size().reset_index(name='Count')
-            issuer_summary.to_excel(writer, sheet_name='By Issuer', index=False)
+        def emit(tables):
+            for name, frame in tables:
+                for writer in writers:
+                    writer.write_frame(name, frame)
         
-        logger.info(f"Report saved: {output_file}")
-        logger.info(f"Summary: {summary}")
+        now = utcnow()
+        total = 0
+        try:
+            for chunk in snapshot.iter_partitions(columns):
+                chunk = classify_expiry(chunk, now)
+                total += len(chunk)
+                for report in reports:
+                    emit(report.feed(chunk))
+            for report in reports:
+                emit(report.finish())
+        finally:
+            for writer in writers:
+                writer.close()
         
-        return output_file
+        paths = [path for writer in writers for path in writer.paths]
+        logger.info(f"Total certificates: {total}")
+        for report in reports:
+            if isinstance(report, SummaryReport):
+                logger.info(f"Summary: {report.counts.astype('int64').to_dict()}")
+        logger.info(f"Report saved: {', '.join(paths)}")
+        
+        return paths
+
+
+def _excel_benchmark_child(rows, conn):
+    import resource
+    import tempfile
+    
+    start = datetime.now()
+    expiry = datetime(2027, 1, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        with StreamingExcelWriter(os.path.join(directory, 'bench.xlsx')) as writer:
+            writer.write_rows(
+                'All Certificates',
+                ['Subject', 'Thumbprint', 'Expiry', 'DaysUntilExpiry', 'Status'],
+                ((f"CN=host{i}.contoso.com", f"{i:040X}", expiry, i % 400, 'OK') for i in range(rows))
+            )
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send(((datetime.now() - start).total_seconds(), peak_kb))
+
+
+def benchmark_excel(sizes=(100_000, 1_000_000, 3_000_000)):
+    """Peak RSS of StreamingExcelWriter per row count, each in a fresh process."""
+    import multiprocessing
+    
+    for rows in sizes:
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_excel_benchmark_child, args=(rows, child))
+        process.start()
+        elapsed, peak_kb = parent.recv()
+        process.join()
+        sheets = -(-rows // (StreamingExcelWriter.MAX_ROWS - 1))
+        print(f"{rows:>10,} rows  {sheets} sheet(s)  {elapsed:8.1f}s  peak RSS {peak_kb / 1024:7.1f} MB")
+    return 0
+
+
+def _option(name, default):
+    """Value of `--name VALUE` or `--name=VALUE` on the command line."""
+    args = sys.argv[1:]
+    for i, arg in enumerate(args):
+        if arg == name and i + 1 < len(args):
+            return args[i + 1]
+        if arg.startswith(f"{name}="):
+            return arg.split('=', 1)[1]
+    return default
+
 
 def main():
-    if not all([KEYFACTOR_HOST, KEYFACTOR_USERNAME, KEYFACTOR_PASSWORD]):
+    if '--bench-excel' in sys.argv[1:]:
+        return benchmark_excel()
+    
+    try:
+        reports = parse_reports(_option('--reports', REPORT_DEFINITIONS))
+        formats = parse_formats(_option('--format', REPORT_FORMATS))
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    
+    # --offline reports from the existing snapshot without calling the API
+    offline = '--offline' in sys.argv[1:]
+    
+    if not offline and not all([KEYFACTOR_HOST, KEYFACTOR_USERNAME, KEYFACTOR_PASSWORD]):
         logger.error("Missing Keyfactor credentials")
         return 1
     
+    snapshot = InventorySnapshot()
+    if offline and not snapshot.exists():
+        logger.error(f"No snapshot in {snapshot.directory}; run without --offline first")
+        return 1
+    
     # Create output directory
     os.makedirs(REPORT_OUTPUT_DIR, exist_ok=True)
     
@@ -124,8 +876,11 @@ def main():
         domain=KEYFACTOR_DOMAIN
     )
     
-    report_file = reporter.generate_inventory_report()
-    print(f"Report generated: {report_file}")
+    if not offline:
+        reporter.refresh_snapshot(snapshot, full='--full-refresh' in sys.argv[1:], columns=report_columns(reports))
+    
+    for report_file in reporter.generate_inventory_report(snapshot, reports, formats):
+        print(f"Report generated: {report_file}")
     
     return 0
 
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for validate-device.py.
+
+Point ASSET_DB_HOST / ASSET_DB_PASSWORD at a local PostgreSQL that
+provides get_asset, never the production inventory database.
+
+Usage: validate-device-bench.py <hostname> [iterations]
+"""
+
+import importlib.util
+import os
+import sys
+import time
+
+_spec = importlib.util.spec_from_file_location(
+    'validate_device', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'validate-device.py')
+)
+validate_device = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(validate_device)
+
+
+def benchmark_database(hostname: str, iterations: int = 200):
+    """
+    Time get_asset lookups with a fresh connection per lookup (the old
+    behaviour) and through the pool with the prepared statement.
+    """
+    def fresh_connection():
+        conn = validate_device._db_connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM get_asset(%s)", (hostname,))
+                cursor.fetchone()
+        finally:
+            conn.close()
+
+    pool = validate_device.DatabasePool(validate_device.DB_POOL_SIZE)
+
+    def pooled():
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("EXECUTE get_asset_one (%s)", (hostname,))
+                cursor.fetchone()
+
+    percentile = validate_device._percentile
+    pooled()  # warm one connection, as a daemon would be
+    for label, lookup in (('unpooled', fresh_connection), ('pooled', pooled)):
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            lookup()
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{label:>9}: n={iterations} "
+              f"mean={sum(samples) / len(samples):.2f}ms "
+              f"p50={percentile(samples, 50):.2f}ms "
+              f"p99={percentile(samples, 99):.2f}ms")
+    pool.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <hostname> [iterations]", file=sys.stderr)
+        sys.exit(2)
+
+    benchmark_database(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 200)
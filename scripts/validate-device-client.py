@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Asset Validation Client Shim
+File: /opt/keyfactor/scripts/validate-device-client.py
+Author: Adrian Johnson <adrian207@gmail.com>
+
+Forwards a validation to the long-running daemon started with
+`validate-device.py --daemon` and keeps the same output contract:
+
+    python3 validate-device-client.py webapp01.contoso.com
+    Output: AUTHORIZED|team-web-apps|production|12345
+
+    python3 validate-device-client.py nonexistent.contoso.com
+    Output: DENIED|Device 'nonexistent.contoso.com' not found in any inventory source
+    Exit Code: 1
+
+If the daemon is not reachable (no socket, connection refused) the shim
+falls back to running validate-device.py in-process, so enrollment never
+depends on the daemon. A daemon that accepts the request but does not
+answer within ASSET_VALIDATOR_TIMEOUT is reported as DENIED instead of
+paying for a cold in-process run on top of the wait.
+"""
+
+import os
+import socket
+import sys
+
+DAEMON_SOCKET = os.getenv('ASSET_VALIDATOR_SOCKET', '/run/keyfactor/validate-device.sock')
+DAEMON_TIMEOUT_SECS = float(os.getenv('ASSET_VALIDATOR_TIMEOUT', '30'))
+VALIDATOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'validate-device.py')
+
+
+def query_daemon(hostname: str, requester: str = '') -> str:
+    """Send one request line to the daemon and return its response line"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(DAEMON_TIMEOUT_SECS)
+        sock.connect(DAEMON_SOCKET)
+        request = f"{hostname}\t{requester}" if requester else hostname
+        sock.sendall(f"{request}\n".encode('utf-8'))
+        sock.shutdown(socket.SHUT_WR)
+
+        response = b''
+        while not response.endswith(b'\n'):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+
+    line = response.decode('utf-8').strip()
+    if not line.startswith(('AUTHORIZED|', 'DENIED|')):
+        raise ConnectionError(f"Unexpected daemon response: {line!r}")
+    return line
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <hostname> [requester_email]", file=sys.stderr)
+        sys.exit(2)
+
+    hostname = sys.argv[1]
+    requester = sys.argv[2] if len(sys.argv) > 2 else ''
+
+    try:
+        line = query_daemon(hostname, requester)
+    except TimeoutError:
+        print(f"Validation daemon did not answer within {DAEMON_TIMEOUT_SECS:g}s", file=sys.stderr)
+        print(f"DENIED|Validation timed out for '{hostname}'")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Validation daemon unavailable ({e}), running in-process", file=sys.stderr)
+        os.execv(sys.executable, [sys.executable, VALIDATOR_PATH] + sys.argv[1:])
+
+    print(line)
+    sys.exit(0 if line.startswith('AUTHORIZED|') else 1)
+
+
+if __name__ == '__main__':
+    main()
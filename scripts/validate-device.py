@@ -11,47 +11,147 @@ Usage:
     python3 validate-device.py nonexistent.contoso.com
     Output: DENIED|Device not found
     Exit Code: 1
+
+    python3 validate-device.py --batch sans.txt    (or hostnames on stdin)
+    Output: one "hostname<TAB>AUTHORIZED|..." / "hostname<TAB>DENIED|..." line per host
+    Exit Code: 0 only if every hostname is authorized
+
+    python3 validate-device.py --daemon [socket_path]
+    Serves validations over a Unix socket (see validate-device-client.py)
 """
 
+import atexit
 import csv
+import functools
+import hashlib
 import json
+import mmap
 import os
+import signal
+import socketserver
+import sqlite3
+import struct
 import sys
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+    fcntl = None
 
 # Configuration
 CSV_PATH = os.getenv('ASSET_CSV_PATH', '/opt/keyfactor/asset-inventory/asset-inventory.csv')
-CACHE_PATH = os.getenv('ASSET_CACHE_PATH', '/tmp/asset-inventory-cache.json')
-CACHE_TIMEOUT_SECS = 3600  # 1 hour
+CACHE_PATH = os.getenv('ASSET_CACHE_PATH', '/tmp/asset-inventory-cache.idx')
+
+# Overall budget for one validation across all sources
+VALIDATION_DEADLINE_SECS = float(os.getenv('ASSET_VALIDATION_DEADLINE', '12'))
+
+# Hostnames per set-based source query in --batch mode
+BATCH_SIZE = int(os.getenv('ASSET_BATCH_SIZE', '100'))
 
 # Database config
 DB_HOST = os.getenv('ASSET_DB_HOST', 'asset-db.contoso.com')
 DB_NAME = 'asset_inventory'
 DB_USER = os.getenv('ASSET_DB_USER', 'keyfactor_reader')
 DB_PASSWORD = os.getenv('ASSET_DB_PASSWORD')
+DB_POOL_SIZE = int(os.getenv('ASSET_DB_POOL_SIZE', '4'))
+DB_POOL_TIMEOUT_SECS = float(os.getenv('ASSET_DB_POOL_TIMEOUT', '5'))
+DB_HEALTHCHECK_SECS = int(os.getenv('ASSET_DB_HEALTHCHECK_SECS', '30'))
 
 # ServiceNow config
 SNOW_INSTANCE = os.getenv('SNOW_INSTANCE', 'contoso.service-now.com')
 SNOW_USER = os.getenv('SNOW_USER', 'keyfactor-api')
 SNOW_PASSWORD = os.getenv('SNOW_PASSWORD')
+SNOW_USER_CACHE_SIZE = int(os.getenv('SNOW_USER_CACHE_SIZE', '5000'))
+SNOW_USER_CACHE_TTL_SECS = int(os.getenv('SNOW_USER_CACHE_TTL', '3600'))
+SNOW_PRELOAD_GROUPS = [g.strip() for g in os.getenv('SNOW_PRELOAD_GROUPS', '').split(',') if g.strip()]
 
 # Azure config
 AZURE_SUBSCRIPTION = os.getenv('AZURE_SUBSCRIPTION_ID')
 
+# Kubernetes API config (namespace watch cache, daemon mode only)
+K8S_SERVICEACCOUNT_DIR = '/var/run/secrets/kubernetes.io/serviceaccount'
+K8S_API_SERVER = os.getenv('K8S_API_SERVER') or (
+    f"https://{os.environ['KUBERNETES_SERVICE_HOST']}:{os.getenv('KUBERNETES_SERVICE_PORT', '443')}"
+    if os.getenv('KUBERNETES_SERVICE_HOST') else None
+)
+K8S_TOKEN_PATH = os.getenv('K8S_TOKEN_PATH', f'{K8S_SERVICEACCOUNT_DIR}/token')
+K8S_CA_CERT = os.getenv('K8S_CA_CERT', f'{K8S_SERVICEACCOUNT_DIR}/ca.crt')
+K8S_WATCH_TIMEOUT_SECS = int(os.getenv('K8S_WATCH_TIMEOUT', '300'))
+K8S_STARTUP_WAIT_SECS = float(os.getenv('K8S_STARTUP_WAIT', '5'))  # daemon waits once for the first list
+
+# Remote source result cache
+RESULT_CACHE_PATH = os.getenv('ASSET_RESULT_CACHE_PATH', '/tmp/asset-result-cache.db')
+RESULT_CACHE_SIZE = int(os.getenv('ASSET_RESULT_CACHE_SIZE', '10000'))
+RESULT_POSITIVE_TTL_SECS = int(os.getenv('ASSET_RESULT_TTL', '300'))
+RESULT_NEGATIVE_TTL_SECS = int(os.getenv('ASSET_NEGATIVE_TTL', '60'))
+
+# Per-source circuit breakers
+SOURCE_HEALTH_PATH = os.getenv('ASSET_SOURCE_HEALTH_PATH', '/tmp/asset-source-health.json')
+BREAKER_WINDOW = int(os.getenv('ASSET_BREAKER_WINDOW', '50'))  # samples per source
+BREAKER_WINDOW_SECS = int(os.getenv('ASSET_BREAKER_WINDOW_SECS', '300'))
+BREAKER_MIN_SAMPLES = int(os.getenv('ASSET_BREAKER_MIN_SAMPLES', '5'))
+BREAKER_ERROR_RATE = float(os.getenv('ASSET_BREAKER_ERROR_RATE', '0.5'))
+BREAKER_SLOW_SECS = float(os.getenv('ASSET_BREAKER_SLOW_SECS', '5'))  # p90 latency
+BREAKER_COOLDOWN_SECS = int(os.getenv('ASSET_BREAKER_COOLDOWN', '30'))
+
+# Daemon config
+DAEMON_SOCKET = os.getenv('ASSET_VALIDATOR_SOCKET', '/run/keyfactor/validate-device.sock')
+
+# Process-wide clients and mapped inventory index (kept warm in daemon mode)
+_clients = {}
+_clients_lock = threading.Lock()
+_index_memo = {'index': None, 'refresh': None}
+_index_lock = threading.Lock()
+_daemon_mode = False
+
 
 class AssetInfo:
     """Device/asset metadata"""
     def __init__(self, owner_email: str, owner_team: str, environment: str, 
-                 cost_center: str = '', status: str = 'active'):
+                 cost_center: str = '', status: str = 'active',
+                 matched_hostname: Optional[str] = None):
         self.exists = True
         self.owner_email = owner_email
         self.owner_team = owner_team
         self.environment = environment
         self.cost_center = cost_center
         self.status = status
+        # Inventory row that authorized the request, when it was a wildcard
+        self.matched_hostname = matched_hostname
+    
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            'owner_email': self.owner_email,
+            'owner_team': self.owner_team,
+            'environment': self.environment,
+            'cost_center': self.cost_center,
+            'status': self.status
+        }
+
+
+class SourceUnavailable(Exception):
+    """A source could not give an authoritative answer (error, timeout)"""
+
+
+class SourceNotApplicable(SourceUnavailable):
+    """A source is not installed here (missing SDK or CLI); skipped without counting as a failure"""
+
+
+def format_result(hostname: str, asset: Optional[AssetInfo]) -> Tuple[str, int]:
+    """Build the output line and exit code for a validation result"""
+    if asset and asset.exists and asset.status == 'active':
+        return f"AUTHORIZED|{asset.owner_team}|{asset.environment}|{asset.cost_center}", 0
+    return f"DENIED|Device '{hostname}' not found in any inventory source", 1
 
 
 def authorized(owner_team: str, environment: str, cost_center: str):
@@ -66,54 +166,720 @@ def denied(reason: str):
     sys.exit(1)
 
 
-def is_cache_fresh(cache_path: str, timeout_secs: int) -> bool:
-    """Check if cache file is fresh"""
-    if not os.path.exists(cache_path):
-        return False
+def get_client(name: str, factory):
+    """Return a shared client for a source, creating it on first use"""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def normalize_hostname(hostname: str) -> str:
+    """Canonical form used for inventory keys: trimmed, lower-case, no trailing dot"""
+    return hostname.strip().lower().rstrip('.')
+
+
+def zone_key(hostname: str) -> Tuple[str, ...]:
+    """web.apps.contoso.com -> ('com', 'contoso', 'apps', 'web'); zone members sort together"""
+    return tuple(reversed(hostname.split('.')))
+
+
+def wildcard_parent(hostname: str) -> Optional[str]:
+    """
+    The wildcard that could cover a concrete hostname, per RFC 6125: one
+    leftmost label, never directly under a TLD. web.apps.contoso.com ->
+    *.apps.contoso.com; wildcards and two-label names have none.
+    """
+    labels = hostname.split('.')
+    if len(labels) < 3 or labels[0] == '*':
+        return None
+    return '*.' + '.'.join(labels[1:])
+
+
+def _is_azure_host(hostname: str) -> bool:
+    return hostname.endswith('.contoso.com') or 'internal' in hostname
+
+
+def _is_kubernetes_host(hostname: str) -> bool:
+    return hostname.endswith('.svc.cluster.local')
+
+
+# CSV inventory index
+#
+# Binary file written from the CSV so lookups never deserialize the whole
+# inventory:
+#   header  magic, version, record count, CSV mtime_ns and size
+#   slots   count x (blake2b-64 of normalized hostname, record offset),
+#           sorted by hash for binary search (exact/wildcard lookups)
+#   zones   count x record offset, sorted by zone_key(hostname) so
+#           every host under a zone is one contiguous range
+#   records per host: hostname, owner_email, owner_team, environment,
+#           cost_center, status; each a u16 length + UTF-8 bytes
+INDEX_MAGIC = b'AIDX'
+INDEX_VERSION = 2
+INDEX_HEADER = struct.Struct('<4sHHIqq')
+INDEX_SLOT = struct.Struct('<QQ')
+INDEX_ZONE_SLOT = struct.Struct('<Q')
+INDEX_FIELD_LEN = struct.Struct('<H')
+INDEX_FIELDS = ('hostname', 'owner_email', 'owner_team', 'environment', 'cost_center', 'status')
+
+
+def _hostname_hash(hostname: str) -> int:
+    digest = hashlib.blake2b(hostname.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def csv_fingerprint(csv_path: str) -> Tuple[int, int]:
+    """Identify a CSV version by (mtime_ns, size)"""
+    st = os.stat(csv_path)
+    return st.st_mtime_ns, st.st_size
+
+
+class InventoryIndex:
+    """Read-only, memory-mapped view of an index built by build_inventory_index"""
+    def __init__(self, index_path: str):
+        with open(index_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.file_id = (st.st_ino, st.st_mtime_ns)
+        magic, version, _, count, mtime_ns, size = INDEX_HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._mm.close()
+            raise ValueError(f"{index_path} is not a version {INDEX_VERSION} inventory index")
+        self.count = count
+        self.fingerprint = (mtime_ns, size)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _slot(self, i: int) -> Tuple[int, int]:
+        return INDEX_SLOT.unpack_from(self._mm, INDEX_HEADER.size + i * INDEX_SLOT.size)
+    
+    def _zone_slot(self, i: int) -> int:
+        base = INDEX_HEADER.size + self.count * INDEX_SLOT.size
+        return INDEX_ZONE_SLOT.unpack_from(self._mm, base + i * INDEX_ZONE_SLOT.size)[0]
+    
+    def _hostname_at(self, offset: int) -> str:
+        (length,) = INDEX_FIELD_LEN.unpack_from(self._mm, offset)
+        start = offset + INDEX_FIELD_LEN.size
+        return self._mm[start:start + length].decode('utf-8')
+    
+    def _record(self, offset: int) -> Dict[str, str]:
+        record = {}
+        for field in INDEX_FIELDS:
+            (length,) = INDEX_FIELD_LEN.unpack_from(self._mm, offset)
+            offset += INDEX_FIELD_LEN.size
+            record[field] = self._mm[offset:offset + length].decode('utf-8')
+            offset += length
+        return record
+    
+    def lookup(self, hostname: str) -> Optional[Dict[str, str]]:
+        """Binary search the slot table; O(log n) page touches per lookup"""
+        key = normalize_hostname(hostname)
+        target = _hostname_hash(key)
+        
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._slot(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        
+        # Walk the (almost always single) run of equal hashes
+        while lo < self.count:
+            slot_hash, offset = self._slot(lo)
+            if slot_hash != target:
+                break
+            record = self._record(offset)
+            if record['hostname'] == key:
+                return record
+            lo += 1
+        return None
+    
+    def lookup_covering(self, hostname: str) -> Optional[Dict[str, str]]:
+        """
+        Exact match, else the inventory wildcard row covering the hostname
+        (web.apps.contoso.com -> *.apps.contoso.com). At most two lookups
+        regardless of inventory size; the returned record's hostname says
+        which row matched.
+        """
+        key = normalize_hostname(hostname)
+        record = self.lookup(key)
+        if record is None:
+            parent = wildcard_parent(key)
+            if parent:
+                record = self.lookup(parent)
+        return record
+    
+    def hosts_under(self, zone: str) -> Iterator[Dict[str, str]]:
+        """Every host in the zone (and the zone apex itself), in reversed-label order"""
+        apex = zone_key(normalize_hostname(zone))
+        
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if zone_key(self._hostname_at(self._zone_slot(mid))) < apex:
+                lo = mid + 1
+            else:
+                hi = mid
+        
+        while lo < self.count:
+            offset = self._zone_slot(lo)
+            if zone_key(self._hostname_at(offset))[:len(apex)] != apex:
+                break
+            yield self._record(offset)
+            lo += 1
+    
+    def close(self):
+        self._mm.close()
+
+
+def _pack_field(value: str) -> bytes:
+    data = value.encode('utf-8')[:0xFFFF]
+    return INDEX_FIELD_LEN.pack(len(data)) + data
+
+
+def build_inventory_index(csv_path: str, index_path: str):
+    """Parse the CSV once and write a binary index of its active rows"""
+    fingerprint = csv_fingerprint(csv_path)
+    
+    inventory = {}
+    with open(csv_path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if row.get('status') == 'active' and row.get('hostname'):
+                key = normalize_hostname(row['hostname'])
+                inventory[key] = (
+                    key,
+                    row.get('owner_email') or 'unknown@contoso.com',
+                    row.get('owner_team') or 'unknown',
+                    row.get('environment') or 'unknown',
+                    row.get('cost_center') or '',
+                    row.get('status') or 'active'
+                )
     
-    cache_age = time.time() - os.path.getmtime(cache_path)
-    return cache_age < timeout_secs
+    records = bytearray()
+    slots = []
+    zones = []
+    for key, fields in inventory.items():
+        slots.append((_hostname_hash(key), len(records)))
+        zones.append((zone_key(key), len(records)))
+        for value in fields:
+            records += _pack_field(value)
+    slots.sort()
+    zones.sort()
+    
+    records_start = (INDEX_HEADER.size + len(slots) * INDEX_SLOT.size
+                     + len(zones) * INDEX_ZONE_SLOT.size)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, len(slots), *fingerprint))
+        for slot_hash, offset in slots:
+            f.write(INDEX_SLOT.pack(slot_hash, records_start + offset))
+        for _, offset in zones:
+            f.write(INDEX_ZONE_SLOT.pack(records_start + offset))
+        f.write(records)
+    
+    # Readers may have the old index mapped; never rewrite it in place
+    os.replace(tmp_path, index_path)
+
+
+@contextmanager
+def rebuild_lock(lock_path: str, blocking: bool):
+    """
+    Cross-process lock guarding index rebuilds. Yields True if the lock
+    was acquired; released automatically if the holder dies.
+    """
+    with open(lock_path, 'a+') as f:
+        try:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _open_index(index_path: str) -> Optional[InventoryIndex]:
+    try:
+        return InventoryIndex(index_path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def refresh_inventory_index(blocking: bool) -> bool:
+    """
+    Single-flight rebuild: only the process holding the rebuild lock parses
+    the CSV, and only if the index on disk is still behind the CSV.
+    Returns False if another process holds the lock (non-blocking mode).
+    """
+    with rebuild_lock(f"{CACHE_PATH}.lock", blocking) as acquired:
+        if not acquired:
+            return False
+        on_disk = _open_index(CACHE_PATH)
+        current = on_disk is not None and on_disk.fingerprint == csv_fingerprint(CSV_PATH)
+        if on_disk is not None:
+            on_disk.close()
+        if not current:
+            build_inventory_index(CSV_PATH, CACHE_PATH)
+        return True
+
+
+def _background_refresh():
+    try:
+        refresh_inventory_index(blocking=True)
+    except Exception as e:
+        print(f"Inventory index rebuild failed: {e}", file=sys.stderr)
+    finally:
+        _index_memo['refresh'] = None
+
+
+def get_inventory_index() -> InventoryIndex:
+    """
+    Return the mapped index for the current CSV.
+    
+    When the CSV has changed, the previous generation keeps being served
+    while one process rebuilds (stale-while-revalidate). Only a caller with
+    no index at all waits for the rebuild.
+    """
+    fingerprint = csv_fingerprint(CSV_PATH)
+    index = _index_memo['index']
+    if index is not None and index.fingerprint == fingerprint:
+        return index
+    
+    with _index_lock:
+        index = _index_memo['index']
+        if index is not None and index.fingerprint == fingerprint:
+            return index
+        
+        # Pick up a newer generation renamed into place by another process
+        try:
+            st = os.stat(CACHE_PATH)
+            on_disk_id = (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            on_disk_id = None
+        if on_disk_id is not None and (index is None or index.file_id != on_disk_id):
+            newer = _open_index(CACHE_PATH)
+            if newer is not None:
+                # The previous index may still be in use by other threads;
+                # it is unmapped when garbage collected
+                index = _index_memo['index'] = newer
+        
+        if index is not None and index.fingerprint == fingerprint:
+            return index
+        
+        if index is not None:
+            # Stale: serve it and let a single rebuild catch up
+            if _daemon_mode:
+                if _index_memo['refresh'] is None:
+                    _index_memo['refresh'] = threading.Thread(
+                        target=_background_refresh, name='index-refresh', daemon=True
+                    )
+                    _index_memo['refresh'].start()
+                return index
+            if not refresh_inventory_index(blocking=False):
+                return index
+        else:
+            refresh_inventory_index(blocking=True)
+        
+        index = _open_index(CACHE_PATH)
+        if index is None:
+            raise OSError(f"Inventory index {CACHE_PATH} could not be built")
+        _index_memo['index'] = index
+        return index
+
+
+# Remote source result cache
+class TTLCache:
+    """Bounded, thread-safe LRU whose entries each expire at a fixed time"""
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key) -> Tuple[bool, Any]:
+        """Return (found, value); found is False on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+    
+    def put(self, key, value, ttl: float = 0, expires_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (expires_at if expires_at is not None else time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+class ResultCache:
+    """
+    Cache of source lookups keyed by (source, normalized hostname).
+    
+    Hits (AssetInfo) and authoritative misses (None) are kept with separate
+    TTLs in a bounded in-process LRU. An optional SQLite store shares the
+    same entries between one-shot CLI invocations.
+    """
+    def __init__(self, max_entries: int, positive_ttl: int, negative_ttl: int,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.db_path = db_path
+        self._memory = TTLCache(max_entries)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_writes = 0
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0}
+    
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.db_path:
+            try:
+                self._db = sqlite3.connect(self.db_path, timeout=1, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    " source TEXT NOT NULL, hostname TEXT NOT NULL,"
+                    " payload TEXT, expires_at REAL NOT NULL,"
+                    " PRIMARY KEY (source, hostname))"
+                )
+            except sqlite3.Error as e:
+                print(f"Result cache store unavailable: {e}", file=sys.stderr)
+                self.db_path = None
+                self._db = None
+        return self._db
+    
+    def summary(self) -> dict:
+        return dict(self.stats, evictions=self._memory.evictions, entries=len(self._memory))
+    
+    def get(self, source: str, hostname: str) -> Tuple[bool, Optional[AssetInfo]]:
+        """Return (found, asset); found is False on a miss or expired entry"""
+        key = (source, normalize_hostname(hostname))
+        now = time.time()
+        with self._lock:
+            found, payload = self._memory.get(key)
+            
+            if not found:
+                db = self._connect()
+                if db is not None:
+                    try:
+                        row = db.execute(
+                            "SELECT expires_at, payload FROM results"
+                            " WHERE source = ? AND hostname = ? AND expires_at > ?",
+                            (key[0], key[1], now)
+                        ).fetchone()
+                    except sqlite3.Error:
+                        row = None
+                    if row is not None:
+                        found, payload = True, (json.loads(row[1]) if row[1] else None)
+                        self._memory.put(key, payload, expires_at=row[0])
+            
+            if not found:
+                self.stats['misses'] += 1
+                return False, None
+            if payload is None:
+                self.stats['negative_hits'] += 1
+                return True, None
+            self.stats['hits'] += 1
+            return True, AssetInfo(**payload)
+    
+    def put(self, source: str, hostname: str, asset: Optional[AssetInfo]):
+        key = (source, normalize_hostname(hostname))
+        payload = asset.to_dict() if asset else None
+        expires_at = time.time() + (self.positive_ttl if asset else self.negative_ttl)
+        with self._lock:
+            self._memory.put(key, payload, expires_at=expires_at)
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                with db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                        (key[0], key[1], json.dumps(payload) if payload else None, expires_at)
+                    )
+                    self._db_writes += 1
+                    if self._db_writes % 256 == 0:
+                        self._prune(db)
+            except sqlite3.Error as e:
+                print(f"Result cache write failed: {e}", file=sys.stderr)
+    
+    def _prune(self, db: sqlite3.Connection):
+        """Drop expired rows, then the soonest-expiring rows beyond the size bound"""
+        db.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        db.execute(
+            "DELETE FROM results WHERE rowid IN ("
+            " SELECT rowid FROM results ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+
+RESULT_CACHE = ResultCache(
+    RESULT_CACHE_SIZE,
+    RESULT_POSITIVE_TTL_SECS,
+    RESULT_NEGATIVE_TTL_SECS,
+    db_path=RESULT_CACHE_PATH or None
+)
+
+
+# Source health
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class CircuitBreaker:
+    """
+    Rolling latency/error window for one source.
+    
+    closed     every lookup runs; opens when, over the last
+               BREAKER_WINDOW_SECS, the error rate reaches
+               BREAKER_ERROR_RATE or p90 latency reaches BREAKER_SLOW_SECS
+    open       lookups are skipped for BREAKER_COOLDOWN_SECS
+    half_open  one probe runs; success closes, failure re-opens
+    
+    Every allow() that returns True must be followed by a record() or a
+    release(), which is what frees a half-open probe.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.state = 'closed'
+        self.reason = ''
+        self.opened_at = 0.0
+        self.skipped = 0
+        self.samples = deque(maxlen=BREAKER_WINDOW)  # (timestamp, latency_secs, ok)
+        self._probing = False
+    
+    def allow(self, now: float) -> bool:
+        if self.state == 'open':
+            if now - self.opened_at < BREAKER_COOLDOWN_SECS:
+                self.skipped += 1
+                return False
+            self.state = 'half_open'
+            self._probing = False
+        if self.state == 'half_open':
+            if self._probing:
+                self.skipped += 1
+                return False
+            self._probing = True
+        return True
+    
+    def _open(self, now: float, reason: str):
+        self.state = 'open'
+        self.reason = reason
+        self.opened_at = now
+        print(f"{self.name} circuit opened: {reason}", file=sys.stderr)
+    
+    def release(self):
+        """End an allowed lookup that never reached the source"""
+        self._probing = False
+    
+    def record(self, now: float, latency: float, ok: bool):
+        self.samples.append((now, latency, ok))
+        
+        if self.state == 'half_open':
+            self._probing = False
+            if ok and latency < BREAKER_SLOW_SECS:
+                self.state = 'closed'
+                self.reason = ''
+                self.samples.clear()
+                self.samples.append((now, latency, ok))
+            else:
+                self._open(now, 'probe failed' if not ok else f"probe took {latency:.1f}s")
+            return
+        
+        recent = [sample for sample in self.samples if now - sample[0] <= BREAKER_WINDOW_SECS]
+        if self.state != 'closed' or len(recent) < BREAKER_MIN_SAMPLES:
+            return
+        error_rate = sum(1 for sample in recent if not sample[2]) / len(recent)
+        p90 = _percentile([sample[1] for sample in recent], 90)
+        if error_rate >= BREAKER_ERROR_RATE:
+            self._open(now, f"error rate {error_rate:.0%} over {len(recent)} lookups")
+        elif p90 >= BREAKER_SLOW_SECS:
+            self._open(now, f"p90 latency {p90:.1f}s over {len(recent)} lookups")
+    
+    def status(self, now: float) -> dict:
+        recent = [sample for sample in self.samples if now - sample[0] <= BREAKER_WINDOW_SECS]
+        latencies = [sample[1] * 1000 for sample in recent]
+        return {
+            'state': self.state,
+            'reason': self.reason,
+            'opened_at': self.opened_at,
+            'skipped': self.skipped,
+            'lookups': len(recent),
+            'error_rate': round(sum(1 for sample in recent if not sample[2]) / len(recent), 3) if recent else 0.0,
+            'p50_ms': round(_percentile(latencies, 50), 1) if latencies else None,
+            'p90_ms': round(_percentile(latencies, 90), 1) if latencies else None,
+            'p99_ms': round(_percentile(latencies, 99), 1) if latencies else None,
+            'samples': list(self.samples),
+        }
+
+
+class SourceHealth:
+    """
+    Circuit breakers for every source, shared between invocations through
+    a JSON status file (last writer wins; the breakers only need an
+    approximate picture) and exposed by the daemon's !stats command.
+    """
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+    
+    def _breaker(self, source: str) -> CircuitBreaker:
+        if source not in self._breakers:
+            self._breakers[source] = CircuitBreaker(source)
+        return self._breakers[source]
+    
+    def allow(self, source: str) -> bool:
+        with self._lock:
+            allowed = self._breaker(source).allow(time.time())
+            self._dirty = True
+            return allowed
+    
+    def record(self, source: str, latency: float, ok: bool):
+        with self._lock:
+            self._breaker(source).record(time.time(), latency, ok)
+            self._dirty = True
+    
+    def release(self, source: str):
+        with self._lock:
+            self._breaker(source).release()
+    
+    def status(self) -> Dict[str, dict]:
+        now = time.time()
+        with self._lock:
+            return {name: breaker.status(now) for name, breaker in self._breakers.items()}
+    
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring source health file {self.path}: {e}", file=sys.stderr)
+            return
+        with self._lock:
+            for name, data in saved.items():
+                breaker = self._breaker(name)
+                breaker.state = data.get('state', 'closed')
+                breaker.reason = data.get('reason', '')
+                breaker.opened_at = data.get('opened_at', 0.0)
+                breaker.skipped = data.get('skipped', 0)
+                breaker.samples.extend(tuple(sample) for sample in data.get('samples', []))
+    
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        status = self.status()
+        self._dirty = False
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(status, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not write source health file {self.path}: {e}", file=sys.stderr)
+
+
+SOURCE_HEALTH = SourceHealth(SOURCE_HEALTH_PATH or None)
+
+
+def cached_source(source: str, applies=lambda hostname: True, cache: bool = True):
+    """
+    Serve a remote source through its circuit breaker and RESULT_CACHE.
+    The wrapped lookup returns an AssetInfo or None (authoritative miss,
+    negatively cached) and raises SourceUnavailable when it could not
+    answer (never cached, counted against the breaker), or
+    SourceNotApplicable when it is not installed (a silent miss).
+    """
+    def decorator(lookup):
+        @functools.wraps(lookup)
+        def wrapper(hostname: str) -> Optional[AssetInfo]:
+            if not applies(hostname):
+                return None
+            if cache:
+                found, asset = RESULT_CACHE.get(source, hostname)
+                if found:
+                    return asset
+            if not SOURCE_HEALTH.allow(source):
+                print(f"{source} skipped: circuit open", file=sys.stderr)
+                return None
+            
+            start = time.monotonic()
+            ok = False
+            installed = True
+            try:
+                asset = lookup(hostname)
+                ok = True
+            except SourceNotApplicable:
+                installed = False
+                return None
+            except SourceUnavailable as e:
+                print(f"{source} validation error: {e}", file=sys.stderr)
+                return None
+            finally:
+                # Any outcome, including an unexpected exception, must reach
+                # the breaker or a half-open probe would never be released
+                if installed:
+                    SOURCE_HEALTH.record(source, time.monotonic() - start, ok)
+                else:
+                    SOURCE_HEALTH.release(source)
+            if cache:
+                RESULT_CACHE.put(source, hostname, asset)
+            return asset
+        return wrapper
+    return decorator
 
 
 # CSV Validation
+def _asset_from_index_record(hostname: str, record: Optional[Dict[str, str]]) -> Optional[AssetInfo]:
+    if not record or record['status'] != 'active':
+        return None
+    return AssetInfo(
+        owner_email=record['owner_email'],
+        owner_team=record['owner_team'],
+        environment=record['environment'],
+        cost_center=record['cost_center'],
+        status=record['status'],
+        matched_hostname=record['hostname'] if record['hostname'] != normalize_hostname(hostname) else None
+    )
+
+
 def validate_from_csv(hostname: str) -> Optional[AssetInfo]:
-    """Validate device from CSV file"""
+    """
+    Validate device from CSV file (via the mapped inventory index). A
+    concrete hostname is also authorized by a wildcard row covering it; a
+    wildcard SAN needs the same wildcard row in the inventory.
+    """
     try:
-        # Try cache first
-        if is_cache_fresh(CACHE_PATH, CACHE_TIMEOUT_SECS):
-            with open(CACHE_PATH, 'r') as f:
-                cache = json.load(f)
-                if hostname in cache:
-                    data = cache[hostname]
-                    if data['status'] == 'active':
-                        return AssetInfo(**data)
-        
-        # Load CSV
         if not os.path.exists(CSV_PATH):
             return None
         
-        inventory = {}
-        with open(CSV_PATH, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if row.get('status') == 'active':
-                    inventory[row['hostname']] = {
-                        'owner_email': row.get('owner_email', 'unknown@contoso.com'),
-                        'owner_team': row.get('owner_team', 'unknown'),
-                        'environment': row.get('environment', 'unknown'),
-                        'cost_center': row.get('cost_center', ''),
-                        'status': row.get('status', 'active')
-                    }
-        
-        # Save cache
-        with open(CACHE_PATH, 'w') as f:
-            json.dump(inventory, f, indent=2)
-        
-        # Lookup hostname
-        if hostname in inventory:
-            return AssetInfo(**inventory[hostname])
-        
-        return None
+        return _asset_from_index_record(hostname, get_inventory_index().lookup_covering(hostname))
     
     except Exception as e:
         print(f"CSV validation error: {e}", file=sys.stderr)
@@ -121,49 +887,163 @@ def validate_from_csv(hostname: str) -> Optional[AssetInfo]:
 
 
 # Database Validation
+def _asset_from_db_row(row) -> AssetInfo:
+    # get_asset returns: hostname, owner_email, owner_team, environment, cost_center, status
+    return AssetInfo(
+        owner_email=row[1],
+        owner_team=row[2],
+        environment=row[3],
+        cost_center=row[4],
+        status=row[5]
+    )
+
+
+def _db_connect():
+    import psycopg2
+    
+    return psycopg2.connect(
+        host=DB_HOST,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        connect_timeout=5
+    )
+
+
+class DatabasePool:
+    """
+    Bounded pool of autocommit psycopg2 connections.
+    
+    Checkout blocks (up to DB_POOL_TIMEOUT_SECS) instead of failing when
+    all connections are busy. Connections idle longer than
+    DB_HEALTHCHECK_SECS are pinged before reuse and replaced if dead. Each
+    connection prepares the get_asset statements once.
+    """
+    PREPARE_STATEMENTS = (
+        "PREPARE get_asset_one (text) AS SELECT * FROM get_asset($1)",
+        "PREPARE get_asset_many (text[]) AS"
+        " SELECT h.name, a.* FROM unnest($1) AS h(name)"
+        " CROSS JOIN LATERAL get_asset(h.name) AS a",
+    )
+    
+    def __init__(self, size: int):
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._last_used = {}
+        self._lock = threading.Lock()
+    
+    def _open(self):
+        conn = _db_connect()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for statement in self.PREPARE_STATEMENTS:
+                cursor.execute(statement)
+        return conn
+    
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def _checkout(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            return self._open()
+        
+        idle_secs = time.monotonic() - self._last_used.get(id(conn), 0)
+        if conn.closed or idle_secs > DB_HEALTHCHECK_SECS:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except Exception:
+                self._discard(conn)
+                return self._open()
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=DB_POOL_TIMEOUT_SECS):
+            raise TimeoutError(f"No database connection free within {DB_POOL_TIMEOUT_SECS}s")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._last_used[id(conn)] = time.monotonic()
+                with self._lock:
+                    self._idle.append(conn)
+            self._slots.release()
+    
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+def get_database_pool() -> DatabasePool:
+    return get_client('database', lambda: DatabasePool(DB_POOL_SIZE))
+
+
+@cached_source('database', lambda hostname: bool(DB_PASSWORD), cache=False)
 def validate_from_database(hostname: str) -> Optional[AssetInfo]:
     """Validate device from PostgreSQL database"""
-    if not DB_PASSWORD:
-        return None
     
     try:
-        import psycopg2
-        
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            connect_timeout=5
-        )
-        
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM get_asset(%s)", (hostname,))
-        row = cursor.fetchone()
+        with get_database_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("EXECUTE get_asset_one (%s)", (hostname,))
+                row = cursor.fetchone()
         
         if row:
-            # Assuming function returns: hostname, owner_email, owner_team, environment, cost_center, status
-            return AssetInfo(
-                owner_email=row[1],
-                owner_team=row[2],
-                environment=row[3],
-                cost_center=row[4],
-                status=row[5]
-            )
+            return _asset_from_db_row(row)
         
-        cursor.close()
-        conn.close()
         return None
     
     except ImportError:
-        print("psycopg2 not installed, skipping database validation", file=sys.stderr)
-        return None
+        raise SourceNotApplicable("psycopg2 not installed") from None
     except Exception as e:
-        print(f"Database validation error: {e}", file=sys.stderr)
-        return None
+        raise SourceUnavailable(str(e)) from e
 
 
 # Azure Validation
+AZURE_PROJECTION = """
+        | project 
+            hostname = name,
+            computer_name = tostring(properties.osProfile.computerName),
+            owner_email = tags.Owner,
+            owner_team = tags.Team,
+            environment = tags.Environment,
+            cost_center = tags.CostCenter,
+            status = case(
+                properties.extended.instanceView.powerState.displayStatus == 'VM running', 'active',
+                'inactive'
+            )
+"""
+
+
+def _asset_from_azure_row(data: dict) -> Optional[AssetInfo]:
+    if data['status'] != 'active':
+        return None
+    return AssetInfo(
+        owner_email=data.get('owner_email', 'unknown@contoso.com'),
+        owner_team=data.get('owner_team', 'unknown'),
+        environment=data.get('environment', 'unknown'),
+        cost_center=data.get('cost_center', ''),
+        status=data['status']
+    )
+
+
+@cached_source('azure', _is_azure_host)
 def validate_from_azure(hostname: str) -> Optional[AssetInfo]:
     """Validate device from Azure Resource Graph"""
     if not hostname.endswith('.contoso.com') and 'internal' not in hostname:
@@ -173,65 +1053,215 @@ def validate_from_azure(hostname: str) -> Optional[AssetInfo]:
         from azure.identity import DefaultAzureCredential
         from azure.mgmt.resourcegraph import ResourceGraphClient
         
-        credential = DefaultAzureCredential()
-        client = ResourceGraphClient(credential)
+        client = get_client('azure', lambda: ResourceGraphClient(DefaultAzureCredential()))
         
         query = f"""
         Resources
         | where type == 'microsoft.compute/virtualmachines'
         | where name == '{hostname}' or properties.osProfile.computerName == '{hostname}'
-        | project 
-            hostname = name,
-            owner_email = tags.Owner,
-            owner_team = tags.Team,
-            environment = tags.Environment,
-            cost_center = tags.CostCenter,
-            status = case(
-                properties.extended.instanceView.powerState.displayStatus == 'VM running', 'active',
-                'inactive'
-            )
+        {AZURE_PROJECTION}
         | limit 1
         """
         
         result = client.resources(query={'query': query})
         
         if result.data:
-            data = result.data[0]
-            if data['status'] == 'active':
-                return AssetInfo(
-                    owner_email=data.get('owner_email', 'unknown@contoso.com'),
-                    owner_team=data.get('owner_team', 'unknown'),
-                    environment=data.get('environment', 'unknown'),
-                    cost_center=data.get('cost_center', ''),
-                    status=data['status']
-                )
+            return _asset_from_azure_row(result.data[0])
         
         return None
     
     except ImportError:
-        print("Azure SDK not installed, skipping Azure validation", file=sys.stderr)
-        return None
+        raise SourceNotApplicable("Azure SDK not installed") from None
     except Exception as e:
-        print(f"Azure validation error: {e}", file=sys.stderr)
-        return None
+        raise SourceUnavailable(str(e)) from e
 
 
 # Kubernetes Validation
+def _kubernetes_namespace(hostname: str) -> Optional[str]:
+    # Format: service.namespace.svc.cluster.local
+    parts = hostname.split('.')
+    if len(parts) < 4 or parts[2] != 'svc':
+        return None
+    return parts[1]
+
+
+def _asset_from_namespace(ns_data: dict) -> Optional[AssetInfo]:
+    if ns_data['status']['phase'] != 'Active':
+        return None
+    
+    labels = ns_data.get('metadata', {}).get('labels', {})
+    annotations = ns_data.get('metadata', {}).get('annotations', {})
+    
+    owner_email = annotations.get('owner-email') or labels.get('owner', 'unknown@contoso.com')
+    
+    return AssetInfo(
+        owner_email=owner_email,
+        owner_team=labels.get('team', 'unknown'),
+        environment=labels.get('environment', 'unknown'),
+        cost_center=labels.get('cost-center', ''),
+        status='active'
+    )
+
+
+class NamespaceWatchCache:
+    """
+    In-memory copy of all namespaces, kept current by one list followed by
+    a watch stream against the API server.
+    
+    The watch resumes from the last resourceVersion seen (including
+    bookmarks). A 410 Gone triggers a fresh list; a broken stream or any
+    other ERROR event triggers one after an exponential backoff. While
+    the cache has not synced, or the last relist failed, is_ready() is
+    False and callers should fall back to kubectl.
+    """
+    def __init__(self, api_server: str, token: Optional[str] = None, ca_cert=True):
+        import requests
+        
+        self.api_server = api_server.rstrip('/')
+        self.session = requests.Session()
+        self.session.verify = ca_cert
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+        self._namespaces = {}
+        self._resource_version = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self.stats = {'lists': 0, 'events': 0, 'errors': 0}
+        self._thread = threading.Thread(target=self._run, name='k8s-namespace-watch', daemon=True)
+    
+    def start(self) -> 'NamespaceWatchCache':
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+    
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+    
+    def wait_ready(self, timeout: float) -> bool:
+        return self._ready.wait(timeout)
+    
+    def get(self, namespace: str) -> Optional[dict]:
+        return self._namespaces.get(namespace)
+    
+    def _list(self):
+        response = self.session.get(f"{self.api_server}/api/v1/namespaces", timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        self._namespaces = {
+            item['metadata']['name']: item for item in data.get('items', [])
+        }
+        self._resource_version = data.get('metadata', {}).get('resourceVersion')
+        self.stats['lists'] += 1
+        self._ready.set()
+    
+    def _watch(self):
+        """Apply watch events until the server closes the stream; False means relist"""
+        params = {
+            'watch': '1',
+            'allowWatchBookmarks': 'true',
+            'timeoutSeconds': K8S_WATCH_TIMEOUT_SECS,
+        }
+        if self._resource_version:
+            params['resourceVersion'] = self._resource_version
+        
+        with self.session.get(
+            f"{self.api_server}/api/v1/namespaces",
+            params=params,
+            stream=True,
+            timeout=(10, K8S_WATCH_TIMEOUT_SECS + 30)
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if self._stop.is_set():
+                    return True
+                if not line:
+                    continue
+                event = json.loads(line)
+                obj = event.get('object', {})
+                if event.get('type') == 'ERROR':
+                    # 410 Gone: our resourceVersion is too old to resume from
+                    if obj.get('code') == 410:
+                        return False
+                    raise RuntimeError(f"watch ERROR event {obj.get('code')}: {obj.get('message')}")
+                
+                metadata = obj.get('metadata', {})
+                if metadata.get('resourceVersion'):
+                    self._resource_version = metadata['resourceVersion']
+                if event.get('type') in ('ADDED', 'MODIFIED'):
+                    self._namespaces[metadata['name']] = obj
+                elif event.get('type') == 'DELETED':
+                    self._namespaces.pop(metadata.get('name'), None)
+                self.stats['events'] += 1
+        return True
+    
+    def _run(self):
+        backoff = 1
+        needs_list = True
+        while not self._stop.is_set():
+            try:
+                if needs_list:
+                    self._list()
+                needs_list = not self._watch()
+                backoff = 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Kubernetes namespace watch error: {e}", file=sys.stderr)
+                if needs_list:
+                    self._ready.clear()
+                needs_list = True
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+
+def get_namespace_watch() -> Optional[NamespaceWatchCache]:
+    """The shared namespace watch, started on first use in daemon mode"""
+    if not (_daemon_mode and K8S_API_SERVER):
+        return None
+    
+    def start_watch():
+        token = None
+        if os.path.exists(K8S_TOKEN_PATH):
+            with open(K8S_TOKEN_PATH, 'r') as f:
+                token = f.read().strip()
+        ca_cert = K8S_CA_CERT if os.path.exists(K8S_CA_CERT) else True
+        return NamespaceWatchCache(K8S_API_SERVER, token, ca_cert).start()
+    
+    return get_client('kubernetes-watch', start_watch)
+
+
 def validate_from_kubernetes(hostname: str) -> Optional[AssetInfo]:
     """Validate device from Kubernetes namespace"""
-    if not hostname.endswith('.svc.cluster.local'):
+    if not _is_kubernetes_host(hostname):
         return None
     
+    try:
+        watch = get_namespace_watch()
+    except Exception as e:
+        print(f"Kubernetes namespace watch unavailable: {e}", file=sys.stderr)
+        watch = None
+    
+    # Dictionary hit against the watch cache; not put in RESULT_CACHE so
+    # label and annotation changes show up as soon as the watch sees them
+    if watch is not None and watch.is_ready():
+        namespace = _kubernetes_namespace(hostname)
+        ns_data = watch.get(namespace) if namespace else None
+        return _asset_from_namespace(ns_data) if ns_data else None
+    
+    return validate_from_kubectl(hostname)
+
+
+@cached_source('kubernetes', _is_kubernetes_host)
+def validate_from_kubectl(hostname: str) -> Optional[AssetInfo]:
+    """Validate device from Kubernetes namespace via kubectl"""
     try:
         import subprocess
         
-        # Extract namespace from hostname (format: service.namespace.svc.cluster.local)
-        parts = hostname.split('.')
-        if len(parts) < 4 or parts[2] != 'svc':
+        namespace = _kubernetes_namespace(hostname)
+        if not namespace:
             return None
         
-        namespace = parts[1]
-        
         # Get namespace info using kubectl
         result = subprocess.run(
             ['kubectl', 'get', 'namespace', namespace, '-o', 'json'],
@@ -241,35 +1271,94 @@ def validate_from_kubernetes(hostname: str) -> Optional[AssetInfo]:
         )
         
         if result.returncode != 0:
-            return None
-        
-        ns_data = json.loads(result.stdout)
-        
-        if ns_data['status']['phase'] != 'Active':
-            return None
-        
-        labels = ns_data.get('metadata', {}).get('labels', {})
-        annotations = ns_data.get('metadata', {}).get('annotations', {})
+            if 'NotFound' in result.stderr:
+                return None
+            raise SourceUnavailable(result.stderr.strip() or f"kubectl exited {result.returncode}")
         
-        owner_email = annotations.get('owner-email') or labels.get('owner', 'unknown@contoso.com')
-        
-        return AssetInfo(
-            owner_email=owner_email,
-            owner_team=labels.get('team', 'unknown'),
-            environment=labels.get('environment', 'unknown'),
-            cost_center=labels.get('cost-center', ''),
-            status='active'
-        )
+        return _asset_from_namespace(json.loads(result.stdout))
     
+    except SourceUnavailable:
+        raise
     except FileNotFoundError:
-        print("kubectl not found, skipping Kubernetes validation", file=sys.stderr)
-        return None
+        raise SourceNotApplicable("kubectl not found") from None
     except Exception as e:
-        print(f"Kubernetes validation error: {e}", file=sys.stderr)
-        return None
+        raise SourceUnavailable(str(e)) from e
 
 
 # ServiceNow Validation
+# owned_by.email is dot-walked so the owner's email comes back with the CI
+SNOW_CI_FIELDS = 'name,owned_by,owned_by.email,support_group,environment,cost_center'
+SNOW_HEADERS = {'Accept': 'application/json'}
+
+# sys_user sys_id -> email, for CIs where the dot-walked email is empty
+SNOW_USER_CACHE = TTLCache(SNOW_USER_CACHE_SIZE)
+
+
+def _snow_field(ci: dict, field: str, default: str = '', key: str = 'display_value') -> str:
+    """Field from a sysparm_display_value=all record ('display_value' or raw 'value')"""
+    value = ci.get(field)
+    if isinstance(value, dict):
+        value = value.get(key)
+    return value or default
+
+
+def _snow_owner_email(session, owner_id: str) -> str:
+    found, email = SNOW_USER_CACHE.get(owner_id)
+    if found:
+        return email
+    
+    response = session.get(
+        f"https://{SNOW_INSTANCE}/api/now/table/sys_user/{owner_id}",
+        params={'sysparm_fields': 'email'},
+        auth=(SNOW_USER, SNOW_PASSWORD),
+        headers=SNOW_HEADERS,
+        timeout=10
+    )
+    email = response.json().get('result', {}).get('email') or 'unknown@contoso.com'
+    SNOW_USER_CACHE.put(owner_id, email, ttl=SNOW_USER_CACHE_TTL_SECS)
+    return email
+
+
+def preload_snow_users(session, group_name: str) -> int:
+    """Bulk-load sys_id -> email for every member of an assignment group"""
+    response = session.get(
+        f"https://{SNOW_INSTANCE}/api/now/table/sys_user_grmember",
+        params={
+            'sysparm_query': f'group.name={group_name}',
+            'sysparm_fields': 'user,user.email',
+            'sysparm_exclude_reference_link': 'true',
+            'sysparm_limit': 10000
+        },
+        auth=(SNOW_USER, SNOW_PASSWORD),
+        headers=SNOW_HEADERS,
+        timeout=30
+    )
+    response.raise_for_status()
+    
+    loaded = 0
+    for member in response.json().get('result', []):
+        if member.get('user') and member.get('user.email'):
+            SNOW_USER_CACHE.put(member['user'], member['user.email'], ttl=SNOW_USER_CACHE_TTL_SECS)
+            loaded += 1
+    return loaded
+
+
+def _asset_from_snow_ci(session, ci: dict) -> AssetInfo:
+    owner_email = _snow_field(ci, 'owned_by.email', key='value')
+    if not owner_email:
+        owner_id = _snow_field(ci, 'owned_by', key='value')
+        owner_email = _snow_owner_email(session, owner_id) if owner_id else 'unknown@contoso.com'
+    
+    return AssetInfo(
+        owner_email=owner_email,
+        owner_team=_snow_field(ci, 'support_group', 'unknown'),
+        environment=_snow_field(ci, 'environment', 'unknown', key='value'),
+        cost_center=_snow_field(ci, 'cost_center', key='value'),
+        status='active'
+    )
+
+
+@cached_source('servicenow', lambda hostname: bool(SNOW_PASSWORD))
 def validate_from_servicenow(hostname: str) -> Optional[AssetInfo]:
     """Validate device from ServiceNow CMDB"""
     if not SNOW_PASSWORD:
@@ -278,97 +1367,510 @@ def validate_from_servicenow(hostname: str) -> Optional[AssetInfo]:
     try:
         import requests
         
+        session = get_client('servicenow', requests.Session)
         url = f"https://{SNOW_INSTANCE}/api/now/table/cmdb_ci_server"
         params = {
             'sysparm_query': f'name={hostname}^operational_status=1',
-            'sysparm_fields': 'name,owned_by,support_group,environment,cost_center'
+            'sysparm_fields': SNOW_CI_FIELDS,
+            'sysparm_display_value': 'all',
+            'sysparm_exclude_reference_link': 'true',
+            'sysparm_limit': 1
         }
         
-        response = requests.get(
+        response = session.get(
             url,
+            params=params,
             auth=(SNOW_USER, SNOW_PASSWORD),
-            headers={'Accept': 'application/json'},
+            headers=SNOW_HEADERS,
             timeout=10
         )
         
         if response.status_code != 200:
-            return None
+            raise SourceUnavailable(f"HTTP {response.status_code} from {SNOW_INSTANCE}")
         
         data = response.json()
         
         if not data.get('result'):
             return None
         
-        ci = data['result'][0]
-        
-        # Get owner email
-        owner_id = ci.get('owned_by', {}).get('value')
-        if owner_id:
-            owner_url = f"https://{SNOW_INSTANCE}/api/now/table/sys_user/{owner_id}"
-            owner_response = requests.get(
-                owner_url,
-                auth=(SNOW_USER, SNOW_PASSWORD),
-                headers={'Accept': 'application/json'},
-                timeout=10
-            )
-            owner_email = owner_response.json().get('result', {}).get('email', 'unknown@contoso.com')
-        else:
-            owner_email = 'unknown@contoso.com'
-        
-        return AssetInfo(
-            owner_email=owner_email,
-            owner_team=ci.get('support_group', {}).get('display_value', 'unknown'),
-            environment=ci.get('environment', 'unknown'),
-            cost_center=ci.get('cost_center', ''),
-            status='active'
-        )
+        return _asset_from_snow_ci(session, data['result'][0])
     
+    except SourceUnavailable:
+        raise
     except ImportError:
-        print("requests library not installed, skipping ServiceNow validation", file=sys.stderr)
-        return None
+        raise SourceNotApplicable("requests library not installed") from None
     except Exception as e:
-        print(f"ServiceNow validation error: {e}", file=sys.stderr)
-        return None
+        raise SourceUnavailable(str(e)) from e
 
 
 # Main validation logic
+# Sources in order of preference: (name, validator, applies_to_hostname)
+SOURCES = [
+    ('servicenow', validate_from_servicenow, lambda hostname: True),
+    ('database', validate_from_database, lambda hostname: True),
+    ('azure', validate_from_azure, _is_azure_host),
+    ('kubernetes', validate_from_kubernetes, _is_kubernetes_host),
+    ('csv', validate_from_csv, lambda hostname: True),
+]
+
+
+def _run_source(validator, hostname: str, future: Future):
+    """Run one source lookup on a daemon thread and publish the result"""
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(validator(hostname))
+    except Exception as e:
+        future.set_exception(e)
+
+
 def validate_hostname(hostname: str, requester_email: Optional[str] = None) -> Optional[AssetInfo]:
     """
-    Validate hostname against multiple sources in order of preference
+    Validate hostname against multiple sources in order of preference.
+    
+    All applicable sources are queried concurrently under a single
+    VALIDATION_DEADLINE_SECS budget. Results are still taken in SOURCES
+    order: a lower-priority hit only wins once every higher-priority source
+    has missed, failed or run out of time. Lookups that are still running
+    when the winner is known are abandoned (daemon threads, results
+    discarded) so they never delay the response or process exit.
     """
-    # 1. ServiceNow CMDB (if configured)
-    asset = validate_from_servicenow(hostname)
-    if asset and asset.status == 'active':
-        return asset
-    
-    # 2. Database (if configured)
-    asset = validate_from_database(hostname)
-    if asset and asset.status == 'active':
-        return asset
-    
-    # 3. Azure (if applicable)
-    if hostname.endswith('.contoso.com') or 'internal' in hostname:
-        asset = validate_from_azure(hostname)
-        if asset and asset.status == 'active':
-            return asset
+    deadline = time.monotonic() + VALIDATION_DEADLINE_SECS
     
-    # 4. Kubernetes (if applicable)
-    if hostname.endswith('.svc.cluster.local'):
-        asset = validate_from_kubernetes(hostname)
+    futures = []
+    for name, validator, applies in SOURCES:
+        if not applies(hostname):
+            continue
+        future = Future()
+        threading.Thread(
+            target=_run_source,
+            args=(validator, hostname, future),
+            name=f"validate-{name}",
+            daemon=True
+        ).start()
+        futures.append((name, future))
+    
+    for name, future in futures:
+        try:
+            asset = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeoutError:
+            print(f"{name} validation exceeded {VALIDATION_DEADLINE_SECS}s deadline", file=sys.stderr)
+            continue
+        except Exception as e:
+            print(f"{name} validation error: {e}", file=sys.stderr)
+            continue
+        
         if asset and asset.status == 'active':
             return asset
     
-    # 5. CSV (fallback)
-    asset = validate_from_csv(hostname)
-    if asset and asset.status == 'active':
-        return asset
-    
     return None
 
 
+# Bulk validation
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def batch_from_database(hostnames: List[str]) -> Dict[str, AssetInfo]:
+    """get_asset over an array of hostnames in one round-trip"""
+    try:
+        with get_database_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("EXECUTE get_asset_many (%s::text[])", (hostnames,))
+                return {row[0]: _asset_from_db_row(row[1:]) for row in cursor.fetchall()}
+    except ImportError:
+        raise SourceNotApplicable("psycopg2 not installed") from None
+    except Exception as e:
+        raise SourceUnavailable(str(e)) from e
+
+
+def batch_from_azure(hostnames: List[str]) -> Dict[str, AssetInfo]:
+    """Resource Graph lookup using a single `in~` filter"""
+    try:
+        from azure.identity import DefaultAzureCredential
+        from azure.mgmt.resourcegraph import ResourceGraphClient
+    except ImportError:
+        raise SourceNotApplicable("Azure SDK not installed") from None
+    
+    try:
+        client = get_client('azure', lambda: ResourceGraphClient(DefaultAzureCredential()))
+        names = ', '.join(f"'{h}'" for h in hostnames if "'" not in h)
+        query = f"""
+        Resources
+        | where type == 'microsoft.compute/virtualmachines'
+        | where name in~ ({names}) or tostring(properties.osProfile.computerName) in~ ({names})
+        {AZURE_PROJECTION}
+        """
+        result = client.resources(query={'query': query, 'options': {'$top': 1000}})
+        
+        wanted = set(hostnames)
+        found = {}
+        for data in result.data:
+            asset = _asset_from_azure_row(data)
+            for name in (data.get('hostname'), data.get('computer_name')):
+                key = normalize_hostname(name or '')
+                if asset and key in wanted:
+                    found.setdefault(key, asset)
+        return found
+    except Exception as e:
+        raise SourceUnavailable(str(e)) from e
+
+
+def batch_from_kubernetes(hostnames: List[str]) -> Dict[str, AssetInfo]:
+    """One kubectl call for every namespace referenced by the batch"""
+    import subprocess
+    
+    by_namespace = {}
+    for hostname in hostnames:
+        namespace = _kubernetes_namespace(hostname)
+        if namespace:
+            by_namespace.setdefault(namespace, []).append(hostname)
+    if not by_namespace:
+        return {}
+    
+    try:
+        result = subprocess.run(
+            ['kubectl', 'get', 'namespace', *by_namespace, '-o', 'json', '--ignore-not-found'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+    except FileNotFoundError:
+        raise SourceNotApplicable("kubectl not found") from None
+    except Exception as e:
+        raise SourceUnavailable(str(e)) from e
+    
+    if result.returncode != 0:
+        raise SourceUnavailable(result.stderr.strip() or f"kubectl exited {result.returncode}")
+    if not result.stdout.strip():
+        return {}
+    
+    data = json.loads(result.stdout)
+    found = {}
+    for ns_data in data.get('items', [data]):
+        asset = _asset_from_namespace(ns_data)
+        namespace = ns_data.get('metadata', {}).get('name')
+        if asset:
+            for hostname in by_namespace.get(namespace, []):
+                found[hostname] = asset
+    return found
+
+
+def batch_from_servicenow(hostnames: List[str]) -> Dict[str, AssetInfo]:
+    """CMDB lookup using a single `nameIN` query"""
+    try:
+        import requests
+    except ImportError:
+        raise SourceNotApplicable("requests library not installed") from None
+    
+    try:
+        session = get_client('servicenow', requests.Session)
+        response = session.get(
+            f"https://{SNOW_INSTANCE}/api/now/table/cmdb_ci_server",
+            params={
+                'sysparm_query': f"nameIN{','.join(hostnames)}^operational_status=1",
+                'sysparm_fields': SNOW_CI_FIELDS,
+                'sysparm_display_value': 'all',
+                'sysparm_exclude_reference_link': 'true',
+                'sysparm_limit': len(hostnames) * 2
+            },
+            auth=(SNOW_USER, SNOW_PASSWORD),
+            headers=SNOW_HEADERS,
+            timeout=10
+        )
+        if response.status_code != 200:
+            raise SourceUnavailable(f"HTTP {response.status_code} from {SNOW_INSTANCE}")
+        
+        wanted = set(hostnames)
+        found = {}
+        for ci in response.json().get('result', []):
+            key = normalize_hostname(_snow_field(ci, 'name', key='value'))
+            if key in wanted and key not in found:
+                found[key] = _asset_from_snow_ci(session, ci)
+        return found
+    except SourceUnavailable:
+        raise
+    except Exception as e:
+        raise SourceUnavailable(str(e)) from e
+
+
+def batch_from_csv(hostnames: List[str]) -> Dict[str, AssetInfo]:
+    """All lookups against one mapped index generation"""
+    if not os.path.exists(CSV_PATH):
+        return {}
+    
+    try:
+        index = get_inventory_index()
+        found = {}
+        for hostname in hostnames:
+            asset = _asset_from_index_record(hostname, index.lookup_covering(hostname))
+            if asset:
+                found[hostname] = asset
+        return found
+    except Exception as e:
+        # e.g. an unwritable ASSET_CACHE_PATH; the single-host path degrades the same way
+        raise SourceUnavailable(str(e)) from e
+
+
+# Same precedence as SOURCES: (name, batch lookup, applies_to_hostname, use RESULT_CACHE)
+# (name, lookup_many, applies, cached, exact): exact sources are given the
+# hostnames as spelled, like their single-host lookup; the rest get
+# normalized names
+BATCH_SOURCES = [
+    ('servicenow', batch_from_servicenow, lambda hostname: bool(SNOW_PASSWORD), True, False),
+    ('database', batch_from_database, lambda hostname: bool(DB_PASSWORD), False, True),
+    ('azure', batch_from_azure, _is_azure_host, True, False),
+    ('kubernetes', batch_from_kubernetes, _is_kubernetes_host, True, False),
+    ('csv', batch_from_csv, lambda hostname: True, False, False),
+]
+
+
+def _batch_source(name: str, lookup_many, hostnames: List[str], cached: bool) -> Dict[str, Optional[AssetInfo]]:
+    """Run one source over hostnames in BATCH_SIZE chunks"""
+    results = {}
+    pending = []
+    for hostname in hostnames:
+        if cached:
+            found, asset = RESULT_CACHE.get(name, hostname)
+            if found:
+                results[hostname] = asset
+                continue
+        pending.append(hostname)
+    
+    for chunk in _chunks(pending, BATCH_SIZE):
+        if name != 'csv' and not SOURCE_HEALTH.allow(name):
+            print(f"{name} batch skipped: circuit open", file=sys.stderr)
+            continue
+        start = time.monotonic()
+        ok = False
+        installed = True
+        try:
+            found = lookup_many(chunk)
+            ok = True
+        except SourceNotApplicable:
+            installed = False
+            break
+        except SourceUnavailable as e:
+            print(f"{name} batch validation error: {e}", file=sys.stderr)
+            continue
+        finally:
+            if not installed:
+                SOURCE_HEALTH.release(name)
+            elif name != 'csv':
+                SOURCE_HEALTH.record(name, time.monotonic() - start, ok)
+        for hostname in chunk:
+            results[hostname] = found.get(hostname)
+            if cached:
+                RESULT_CACHE.put(name, hostname, results[hostname])
+    return results
+
+
+def validate_hostnames(hostnames: List[str]) -> Dict[str, Optional[AssetInfo]]:
+    """
+    Validate many hostnames with set-based queries per source.
+    
+    Sources run in SOURCES precedence order, each only over the hostnames
+    no higher-priority source has authorized yet, so later (usually more
+    expensive) sources see a shrinking set.
+    """
+    keys = {h: normalize_hostname(h) for h in hostnames}
+    resolved = {}
+    
+    for name, lookup_many, applies, cached, exact in BATCH_SOURCES:
+        pending = [h for h in keys if h not in resolved and applies(h)]
+        if not pending:
+            continue
+        lookup = pending if exact else list(dict.fromkeys(keys[h] for h in pending))
+        found = _batch_source(name, lookup_many, lookup, cached)
+        for hostname in pending:
+            asset = found.get(hostname if exact else keys[hostname])
+            if asset and asset.status == 'active':
+                resolved[hostname] = asset
+    
+    return {h: resolved.get(h) for h in hostnames}
+
+
+def run_batch(lines: Iterable[str]) -> int:
+    """
+    Validate one hostname per input line, printing "hostname<TAB>result"
+    per host. Exit code is 0 only if every hostname was authorized, which
+    is the rule for a multi-SAN CSR.
+    """
+    exit_code = 0
+    hostnames = (line.strip() for line in lines)
+    hostnames = (h for h in hostnames if h and not h.startswith('#'))
+    
+    # Stream in blocks so auditing millions of hosts runs in bounded memory
+    for block in _chunks(hostnames, BATCH_SIZE * 10):
+        results = validate_hostnames(block)
+        for hostname in block:
+            if results[hostname] and results[hostname].matched_hostname:
+                print(f"{hostname} authorized by inventory row {results[hostname].matched_hostname}",
+                      file=sys.stderr)
+            output, code = format_result(hostname, results[hostname])
+            print(f"{hostname}\t{output}")
+            exit_code = max(exit_code, code)
+        sys.stdout.flush()
+    
+    return exit_code
+
+
+# Daemon mode
+class ValidationRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Line protocol: each request is "hostname[<TAB>requester_email]\n",
+    each response is the usual AUTHORIZED|... / DENIED|... line.
+    The line "!stats" returns a JSON object of cache counters and source
+    health (breaker state, error rate, latency percentiles) instead.
+    """
+    def handle(self):
+        try:
+            self._serve_lines()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client hung up before reading its reply
+    
+    def _serve_lines(self):
+        for raw in self.rfile:
+            line = raw.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            if line == '!stats':
+                self.wfile.write(f"{json.dumps(daemon_stats())}\n".encode('utf-8'))
+                self.wfile.flush()
+                continue
+            hostname, _, requester = line.partition('\t')
+            try:
+                asset = validate_hostname(hostname, requester or None)
+            except Exception as e:
+                print(f"Validation error for {hostname}: {e}", file=sys.stderr)
+                asset = None
+            output, _ = format_result(hostname, asset)
+            self.wfile.write(f"{output}\n".encode('utf-8'))
+            self.wfile.flush()
+
+
+def daemon_stats() -> dict:
+    """Counters reported by the daemon's !stats command"""
+    stats = {
+        'result_cache': RESULT_CACHE.summary(),
+        'servicenow_users': {'entries': len(SNOW_USER_CACHE), 'evictions': SNOW_USER_CACHE.evictions},
+        'sources': {
+            name: {k: v for k, v in status.items() if k != 'samples'}
+            for name, status in SOURCE_HEALTH.status().items()
+        },
+    }
+    watch = _clients.get('kubernetes-watch')
+    if watch is not None:
+        stats['kubernetes_watch'] = dict(
+            watch.stats, ready=watch.is_ready(), namespaces=len(watch._namespaces)
+        )
+    return stats
+
+
+class ValidationDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_daemon(socket_path: str):
+    """Serve validate_hostname over a Unix socket until SIGTERM/SIGINT"""
+    global _daemon_mode
+    _daemon_mode = True
+    
+    SOURCE_HEALTH.load()
+    
+    def save_health():
+        while True:
+            time.sleep(10)
+            SOURCE_HEALTH.save()
+    
+    threading.Thread(target=save_health, name='source-health', daemon=True).start()
+    
+    if SNOW_PASSWORD and SNOW_PRELOAD_GROUPS:
+        try:
+            import requests
+            
+            session = get_client('servicenow', requests.Session)
+            for group in SNOW_PRELOAD_GROUPS:
+                count = preload_snow_users(session, group)
+                print(f"Preloaded {count} ServiceNow users for {group}", file=sys.stderr)
+        except Exception as e:
+            print(f"ServiceNow user preload failed: {e}", file=sys.stderr)
+    
+    # Give the namespace watch one chance to sync before serving; lookups
+    # never wait for it and use kubectl until it is ready
+    try:
+        watch = get_namespace_watch()
+        if watch is not None and not watch.wait_ready(K8S_STARTUP_WAIT_SECS):
+            print(f"Kubernetes namespace watch not synced after {K8S_STARTUP_WAIT_SECS:g}s, "
+                  f"using kubectl until it is", file=sys.stderr)
+    except Exception as e:
+        print(f"Kubernetes namespace watch unavailable: {e}", file=sys.stderr)
+    
+    Path(socket_path).parent.mkdir(parents=True, exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    
+    # Create the socket as 0660 from the start rather than chmod it after bind
+    umask = os.umask(0o117)
+    try:
+        server = ValidationDaemon(socket_path, ValidationRequestHandler)
+    finally:
+        os.umask(umask)
+    
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    print(f"Validation daemon listening on {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        SOURCE_HEALTH.save()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--daemon':
+        serve_daemon(sys.argv[2] if len(sys.argv) > 2 else DAEMON_SOCKET)
+        sys.exit(0)
+    
+    # One-shot runs share breaker state through the status file
+    SOURCE_HEALTH.load()
+    atexit.register(SOURCE_HEALTH.save)
+    
+    if len(sys.argv) >= 3 and sys.argv[1] == '--zone':
+        if not os.path.exists(CSV_PATH):
+            print(f"Asset inventory CSV not found: {CSV_PATH}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            records = list(get_inventory_index().hosts_under(sys.argv[2]))
+        except Exception as e:
+            print(f"Cannot read asset inventory CSV {CSV_PATH}: {e}", file=sys.stderr)
+            sys.exit(1)
+        for record in records:
+            print(f"{record['hostname']}|{record['owner_team']}|{record['environment']}|{record['cost_center']}")
+        sys.exit(0)
+    
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        if len(sys.argv) > 2 and sys.argv[2] != '-':
+            with open(sys.argv[2], 'r') as f:
+                sys.exit(run_batch(f))
+        sys.exit(run_batch(sys.stdin))
+    
     if len(sys.argv) < 2:
         print(f"Usage: {sys.argv[0]} <hostname> [requester_email]", file=sys.stderr)
+        print(f"       {sys.argv[0]} --batch [file|-]", file=sys.stderr)
+        print(f"       {sys.argv[0]} --zone <zone>", file=sys.stderr)
+        print(f"       {sys.argv[0]} --daemon [socket_path]", file=sys.stderr)
         sys.exit(2)
     
     hostname = sys.argv[1]
@@ -376,6 +1878,9 @@ def main():
     
     asset = validate_hostname(hostname, requester)
     
+    if asset and asset.matched_hostname:
+        print(f"{hostname} authorized by inventory row {asset.matched_hostname}", file=sys.stderr)
+    
     if asset and asset.exists and asset.status == 'active':
         authorized(asset.owner_team, asset.environment, asset.cost_center)
     else: